@@ -1,13 +1,102 @@
 import os
+import re
+import copy
 import json
-from typing import List, Dict, Any, Optional, Tuple
+import sys
+import asyncio
+import time
+import string
+import hashlib
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple, Callable, Union
+import dataclasses
 from dataclasses import dataclass, asdict
+from collections.abc import Mapping
 from datetime import datetime
-from playwright.async_api import async_playwright, Page, Browser
+from playwright.async_api import async_playwright, Page, Browser, expect
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 from openai import OpenAI
 from pathlib import Path
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:  # stdlib fallback keeps the agent runnable without orjson
+    orjson = None
+
+
+def _dumps(obj: Any, indent: bool = False, default=None) -> str:
+    """Serialize to a JSON str (orjson when available)"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+    return json.dumps(obj, indent=2 if indent else None, default=default, ensure_ascii=False)
+
+
+def _loads(data):
+    """Parse JSON text (orjson when available)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+def parse_action_plan(response_text: str) -> Optional[Dict[str, Any]]:
+    """Parse the planner reply - direct parse first, then the first JSON object in the text"""
+    try:
+        plan = _loads(response_text)
+    except ValueError:
+        json_start = response_text.find('{')
+        if json_start == -1:
+            return None
+        try:
+            plan, _ = _JSON_DECODER.raw_decode(response_text, json_start)
+        except ValueError:
+            return None
+    return plan if isinstance(plan, dict) else None
+
+
+def summarize_dom(dom_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Condense DOM context to what the planner uses: actionable elements' text/ids/aria/Y"""
+    elements = []
+    for el in dom_data.get('elements', []):
+        purpose = el.get('elementPurpose', 'other')
+        is_input = el.get('isInput', False)
+        if not (is_input or el.get('isButton') or purpose != 'other'):
+            continue
+        compact = {
+            'tag': el.get('tag', ''),
+            'text': el.get('text', '')[:80],
+            'id': el.get('id', ''),
+            'name': el.get('name', ''),
+            'placeholder': el.get('placeholder', ''),
+            'aria_label': el.get('aria_label', ''),
+            'purpose': purpose,
+            'fieldId': el.get('fieldId', '')[:50] if is_input else '',
+            'editable': el.get('isContentEditable', False),
+            'disabled': el.get('disabled', False),
+            'hasValue': el.get('hasValue', False)
+        }
+        compact = {key: value for key, value in compact.items() if value and value != 'other'}
+        compact['y'] = el.get('position', {}).get('y', 0)
+        elements.append(compact)
+    
+    return {
+        'url': dom_data.get('url', ''),
+        'title': dom_data.get('title', ''),
+        'currentSection': dom_data.get('currentSection', 'unknown'),
+        'focusedElement': dom_data.get('focusedElement', 'none'),
+        'isGitHub': dom_data.get('isGitHub', False),
+        'isLinear': dom_data.get('isLinear', False),
+        'hasDialog': dom_data.get('hasDialog', False),
+        'dialogs': [
+            {'text': d.get('text', '')[:200], 'aria_label': d.get('aria_label', '')}
+            for d in dom_data.get('dialogs', [])[:3]
+        ],
+        'elements': elements
+    }
+
 
 APP_URLS = {
     "linear": "https://linear.app",
@@ -15,6 +104,760 @@ APP_URLS = {
 }
 
 
+# URL fragments that indicate a login/auth page
+LOGIN_URL_KEYWORDS = ['login', 'signin', 'auth', 'oauth', 'sessions/verified']
+LOGIN_RE = re.compile("|".join(map(re.escape, LOGIN_URL_KEYWORDS)), re.IGNORECASE)
+
+# Input field purpose keywords - one scan yields every matched category
+FIELD_PURPOSE_RE = re.compile(
+    r"(?P<name>repository name|project name|name|title)|(?P<description>description|summary|about)"
+)
+
+# _smart_click intent keywords (case-insensitive substring match)
+INTERMEDIATE_WORDS = ('continue', 'next', 'proceed', 'choose', 'select', 'skip', 'add')
+FINAL_SUBMIT_PHRASES = ('create repository', 'create project', 'create issue', 'submit', 'publish', 'save')
+# Button texts that mark a final submit when an intermediate button was requested
+FINAL_BUTTON_PHRASES = ('create repository', 'create project', 'create issue', 'submit')
+# Click targets in execute_task that finish creating the task's entity
+CREATION_SUBMIT_PHRASES = (
+    'create repository', 'create project', 'create issue',
+    'submit new issue', 'create pull request', 'publish'
+)
+
+# Compiled alternations of the tuples above - one scan per text instead of one per keyword
+INTERMEDIATE_RE = re.compile("|".join(map(re.escape, INTERMEDIATE_WORDS)), re.IGNORECASE)
+FINAL_SUBMIT_RE = re.compile("|".join(map(re.escape, FINAL_SUBMIT_PHRASES)), re.IGNORECASE)
+FINAL_BUTTON_RE = re.compile("|".join(map(re.escape, FINAL_BUTTON_PHRASES)), re.IGNORECASE)
+CREATION_SUBMIT_RE = re.compile("|".join(map(re.escape, CREATION_SUBMIT_PHRASES)), re.IGNORECASE)
+
+CLICK_STRATEGY_BUILDERS = {
+    'placeholder': lambda t: [f"[placeholder='{t}' i]", f"[placeholder*='{t}' i]"],
+    'aria_label': lambda t: [f"[aria-label='{t}' i]", f"[aria-label*='{t}' i]"],
+    'id': lambda t: [f"#{t}", f"[id='{t}']"],
+    'name': lambda t: [f"[name='{t}']", f"[name*='{t}' i]"],
+}
+
+
+def build_text_click_strategies(target: str, is_final_submit: bool, is_intermediate: bool) -> List[str]:
+    """Build text-based click selectors, ordered by how the target reads (final submit / intermediate)"""
+    strategies = []
+    keywords = target.lower().split()
+    
+    # Strategy 1: For final submit, prioritize multi-word exact matches
+    if is_final_submit and ' ' in target:
+        strategies.extend([
+            f"button:has-text('{target}'):not([disabled])",
+            f"[role='button']:has-text('{target}'):not([aria-disabled='true'])",
+            f"text=/^{target}$/i",
+            f":text-is('{target}')",
+            f"button:text-is('{target}')",
+            f"button >> text=/{target}/i",
+            f"[type='submit']:has-text('{target}')",
+        ])
+    else:
+        # Strategy 1: Exact text match (highest priority)
+        strategies.extend([
+            f"text=/^{target}$/i",
+            f":text-is('{target}')",
+        ])
+    
+    # Strategy 2: Specific element types with exact text
+    if is_intermediate:
+        strategies.extend([
+            f"button:has-text('{target}'):not([disabled])",
+            f"[role='button']:has-text('{target}'):not([aria-disabled='true'])",
+        ])
+    
+    strategies.extend([
+        f"button:has-text('{target}')",
+        f"a:has-text('{target}')",
+        f"[role='button']:has-text('{target}')",
+        f"[role='link']:has-text('{target}')",
+        f"summary:has-text('{target}')",  # GitHub dropdowns
+    ])
+    
+    # Strategy 3: Partial text match
+    strategies.extend([
+        f"text=/{target}/i",
+        f":text('{target}')"
+    ])
+    
+    # Strategy 4: Keyword-based matching
+    if not is_final_submit or not ' ' in target:
+        for word in keywords:
+            if len(word) > 3:
+                strategies.extend([
+                    f"button:has-text('{word}'):not([disabled])",
+                    f"[role='button']:has-text('{word}'):not([aria-disabled='true'])",
+                ])
+    
+    return strategies
+
+
+# _smart_type selector templates by group, formatted with the target as {t}.
+# ('label' | 'textbox', name) pairs are accessibility queries resolved via get_by_label / get_by_role
+TYPE_STRATEGY_TEMPLATES = {
+    'id': ("#{t}", "input#{t}", "[id='{t}']"),
+    'target': (
+        "[name='{t}']",
+        "[name*='{t}' i]",
+        "[placeholder='{t}' i]",
+        "[placeholder*='{t}' i]",
+        "[aria-placeholder*='{t}' i]",
+        "[aria-label='{t}' i]",
+        "[aria-label*='{t}' i]",
+        "[data-testid*='{t}' i]"
+    ),
+    'placeholder': ("[placeholder='{t}' i]", "[placeholder*='{t}' i]", "[aria-placeholder*='{t}' i]"),
+    'aria_label': ("[aria-label='{t}' i]", "[aria-label*='{t}' i]"),
+    'label': (('label', '{t}'), ('textbox', '{t}')),
+    'positional': (
+        "input[type='text']:visible",
+        "input:not([type='hidden']):not([type='submit']):visible",
+        "textarea:visible"
+    ),
+    'fallback': ("[contenteditable='true']",)
+}
+
+
+# Per-key delays (ms) for the keyboard typing fallback, retried in order on a value mismatch
+KEYBOARD_TYPE_DELAYS = (0, 25, 50)
+
+# Leading _smart_type strategies trusted for early exit and the tighter 80px match radius
+PRIORITY_TYPE_STRATEGIES = 6
+# Leading _smart_type strategies counted up front in one concurrent batch (matching is unaffected)
+TYPE_COUNT_BATCH_SIZE = 6
+
+
+@lru_cache(maxsize=256)
+def build_type_strategies(target: str, selector_type: str, has_y: bool) -> Tuple[Union[str, Tuple[str, str]], ...]:
+    """Format the _smart_type selectors for a target, in priority order"""
+    groups = []
+    if target and ' ' not in target and len(target) > 5:
+        groups.append('id')
+    if target:
+        groups.append('target')
+    elif selector_type in ('placeholder', 'aria_label'):
+        groups.append(selector_type)
+    if target and len(target.split()) <= 3:
+        groups.append('label')
+    if has_y:
+        groups.append('positional')
+    groups.append('fallback')
+    # Groups can overlap; dict.fromkeys drops repeats while keeping priority order
+    return tuple(dict.fromkeys(
+        tpl.format(t=target) if isinstance(tpl, str) else (tpl[0], target)
+        for group in groups for tpl in TYPE_STRATEGY_TEMPLATES[group]
+    ))
+
+
+# (elements, words) -> elements whose text contains every word (all of them when words is empty),
+# with disabled/visible state and text trimmed to 200 chars (containers like summary can be huge)
+BUTTON_CANDIDATES_JS = """(els, words) => els.map((el, index) => {
+    const text = (el.textContent || '').trim();
+    const lower = text.toLowerCase();
+    if (!words.every(w => lower.includes(w))) return null;
+    const rect = el.getBoundingClientRect();
+    return {
+        index: index,
+        text: text.slice(0, 200),
+        disabled: el.disabled || el.getAttribute('aria-disabled') === 'true',
+        visible: rect.width > 0 && rect.height > 0
+    };
+}).filter(Boolean)"""
+
+# (elements, targetY) -> the visible element nearest to targetY as {index, y}, or null
+NEAREST_VISIBLE_JS = """(els, targetY) => {
+    let best = null;
+    els.forEach((el, index) => {
+        const rect = el.getBoundingClientRect();
+        if (!(rect.width > 0 && rect.height > 0) ||
+            (el.checkVisibility && !el.checkVisibility({ visibilityProperty: true }))) return;
+        const y = Math.trunc(rect.top);
+        if (!best || Math.abs(y - targetY) < Math.abs(best.y - targetY)) best = { index: index, y: y };
+    });
+    return best;
+}"""
+
+# Empty a value-bearing field; false for elements without a value (e.g. contenteditable)
+CLEAR_VALUE_JS = "el => { if (!('value' in el)) return false; el.value = ''; return true; }"
+
+# elements -> index of the first visible element in document order, or -1
+FIRST_VISIBLE_JS = """els => els.findIndex(el => {
+    const rect = el.getBoundingClientRect();
+    return rect.width > 0 && rect.height > 0 &&
+           (!el.checkVisibility || el.checkVisibility({ visibilityProperty: true }));
+})"""
+
+# Resolve once the DOM has had no mutations for quietMs, or after maxMs at the latest
+DOM_SETTLE_JS = """([quietMs, maxMs]) => new Promise(resolve => {
+    let quiet;
+    const observer = new MutationObserver(() => {
+        clearTimeout(quiet);
+        quiet = setTimeout(done, quietMs);
+    });
+    const cap = setTimeout(done, maxMs);
+    function done() {
+        observer.disconnect();
+        clearTimeout(quiet);
+        clearTimeout(cap);
+        resolve();
+    }
+    observer.observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+    quiet = setTimeout(done, quietMs);
+})"""
+DOM_SETTLE_QUIET_MS = 300
+
+# Verbose tracing of per-field tracker lookups
+DEBUG = os.getenv("AGENT_DEBUG", "").lower() in ("1", "true")
+
+SCREENSHOT_JPEG_QUALITY = 70
+
+# Task keyword -> target entity, checked in priority order
+TASK_ENTITY_KEYWORDS = (
+    ('repository', 'repository'),
+    ('repo', 'repository'),
+    ('project', 'project'),
+    ('issue', 'issue'),
+    ('pull request', 'pull_request'),
+    ('pr', 'pull_request'),
+    ('discussion', 'discussion'),
+    ('gist', 'gist')
+)
+
+
+# Extra Chromium switches on top of Playwright's defaults (which already disable background
+# networking, component updates, extensions, breakpad, renderer backgrounding, first-run, ...).
+# --mute-audio is only a Playwright default in headless mode.
+MINIMAL_CHROMIUM_ARGS = [
+    '--disable-sync',
+    '--mute-audio',
+    '--no-pings'
+]
+
+
+# Requests aborted in fast mode - the agent only needs DOM + a screenshot
+BLOCKED_RESOURCE_TYPES = {'font', 'media'}
+TRACKER_HOSTS = (
+    'google-analytics.com',
+    'googletagmanager.com',
+    'doubleclick.net',
+    'segment.io',
+    'segment.com',
+    'hotjar.com',
+    'intercom.io',
+    'collector.github.com'
+)
+
+
+# Static planner rules; each app's workflow below is appended to form its system message
+PLANNER_RULES = """You are a universal web UI automation agent that learns from the UI.
+
+UNIVERSAL CRITICAL RULES:
+1. LEARN from UI - don't assume element locations
+2. DON'T fill fields marked SKIP
+3. DO use Y-position to differentiate fields
+4. DO provide target_y_position in response
+5. For GitHub:
+   - Read ALL available buttons from the UI sections
+   - Fill required fields first (name/title)
+   - Make visibility/template choices if needed
+   - Follow intermediate steps if present
+   - Final submit only when everything is ready
+   - Use EXACT text from submit buttons section
+6. For Linear: Use existing logic (DON'T CHANGE)
+7. Be adaptive - if one approach fails, try alternatives from available elements
+8. ALWAYS check if button is ENABLED before clicking (disabled buttons won't work)
+9. If submit_buttons visible AND required fields filled → Click submit to complete!
+
+RESPONSE FORMAT (JSON only):
+{
+    "reasoning": "briefly explain (1-3 sentences) what you see, current state, and why you chose this action",
+    "action": "click" | "type" | "type_contenteditable" | "press_key" | "navigate" | "wait" | "complete",
+    "target": "exact text or identifier from the UI sections",
+    "selector_type": "text" | "placeholder" | "aria_label" | "contenteditable" | "id" | "name",
+    "value": "text to type (if typing)",
+    "field_purpose": "title|description|name|summary|body|other",
+    "target_y_position": 0,
+    "wait_after": 2000,
+    "is_complete": false,
+    "confidence": 0.9
+}
+
+CRITICAL FOR TYPING:
+- Use BEST identifier: id > name > placeholder > aria-label
+- Set selector_type to match what you're using
+- Always include accurate target_y_position from the field info"""
+
+
+# Structured-output contract for planner responses (mirrors RESPONSE FORMAT in PLANNER_RULES)
+AGENT_DECISION_SCHEMA = {
+    "name": "agent_decision",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "reasoning": {"type": "string"},
+            "action": {"type": "string", "enum": ["click", "type", "type_contenteditable", "press_key", "navigate", "wait", "complete"]},
+            "target": {"type": "string"},
+            "selector_type": {"type": "string", "enum": ["text", "placeholder", "aria_label", "contenteditable", "id", "name"]},
+            "value": {"type": "string"},
+            "field_purpose": {"type": "string"},
+            "target_y_position": {"type": "integer"},
+            "wait_after": {"type": "integer"},
+            "is_complete": {"type": "boolean"},
+            "confidence": {"type": "number"}
+        },
+        "required": [
+            "reasoning", "action", "target", "selector_type", "value", "field_purpose",
+            "target_y_position", "wait_after", "is_complete", "confidence"
+        ],
+        "additionalProperties": False
+    }
+}
+
+PLANNER_MAX_TOKENS = 400
+# Most recent action summaries handed to the planner each step
+PLANNER_ACTION_HISTORY = 8
+
+# Steady-progress steps go to the lighter model; failures and low-confidence plans get the full one
+PLANNER_MODEL = "gpt-4o"
+ROUTINE_PLANNER_MODEL = "gpt-4o-mini"
+ROUTINE_MIN_CONFIDENCE = 0.5
+
+
+# GitHub workflow guidance (static - the per-step state goes in GITHUB_STATE_TMPL)
+GITHUB_WORKFLOW = """
+    GITHUB WORKFLOW - FULLY DYNAMIC (NO HARDCODING)
+
+    SMART WORKFLOW - LEARN FROM UI ELEMENTS:
+
+    STEP 1️ - NAVIGATE TO CREATION:
+    Check "Current Section" in the GITHUB STATE block
+    
+    Common GitHub creation patterns:
+    - Repositories: Click "+" dropdown → "New repository" OR navigate to /new
+    - Projects: Go to /projects → Click "New project"
+    - Issues: In repository → Click "Issues" tab → "New issue"
+    - Pull Requests: In repository → Click "Pull requests" → "New pull request"
+    
+    Look at "CREATE/NEW BUTTONS" section:
+    - Find button matching your task entity (Task Entity in the GITHUB STATE block)
+    - Common texts: "New repository", "New project", "New issue", "Create repository"
+    - Click to start creation flow
+    - After click → mark in_creation_flow = True
+
+    STEP 2️ - FILL REQUIRED FIELDS (Name/Title):
+    Check "INPUT FIELDS" section
+    
+    Repository creation typically needs:
+    - Repository name (REQUIRED)
+    - Description (optional)
+    
+    Project creation typically needs:
+    - Project name (REQUIRED)
+    - Description (optional)
+    
+    Issue creation typically needs:
+    - Title (REQUIRED)
+    - Description/Body (optional)
+    
+    Rules:
+    - Fill fields marked "CAN FILL"
+    - Skip fields marked "SKIP"
+    - Use Y-position to differentiate similar fields
+    - Fill in order: name/title first, then description
+
+    STEP 3️ - MAKE CHOICES (if presented):
+    
+    A) Repository Visibility (if creating repo):
+    Check " VISIBILITY OPTIONS" section
+    - Look for "Public" or "Private" radio buttons/options
+    - Default is usually "Public" (already selected)
+    - Click if you need to change it
+    
+    B) Repository Settings (optional):
+    Check "REPOSITORY SETTINGS" section
+    - Add README file (checkbox)
+    - Add .gitignore (dropdown/checkbox)
+    - Choose a license (dropdown)
+    - These are OPTIONAL - GitHub can create repo without them
+    
+    C) Project Template (if creating project):
+    Check " TEMPLATE/OPTION CHOICES" section
+    - Look for: "Table", "Board", "Roadmap", "Blank"
+    - Click desired template
+    - Mark choice_made = True after selection
+
+    STEP 4️ - INTERMEDIATE STEPS:
+    Check " INTERMEDIATE BUTTONS" section
+    - Look for: "Continue", "Next", "Add", "Import"
+    - These advance through multi-step flows
+    - Click if present and enabled
+
+    STEP 5️ - FINAL SUBMIT:
+    Check "FINAL SUBMIT BUTTONS" section
+    - Look for: "Create repository", "Create project", "Create issue"
+    - This is the FINAL action - completes the creation
+    - Must have exact text match (don't click partial matches)
+    - Button should be ENABLED (✅)
+
+    STEP 6 - VERIFY COMPLETION:
+    After clicking final submit:
+    - Check if URL changed to new entity (e.g., /username/repo-name)
+    - Check if dialog closed
+    - Check if success message visible
+    - If yes → set is_complete=true, confidence > 0.8
+
+    CRITICAL DYNAMIC RULES:
+    1. DON'T assume button/field names - READ from the UI sections
+    2. DON'T hardcode selectors - use text/aria-label from elements
+    3. DO adapt to what's visible NOW on the page
+    4. DO track state with choice_made and in_creation_flow
+    5. DON'T confuse intermediate buttons with final submit
+    6. DO use exact text from "✅FINAL SUBMIT BUTTONS" section
+    7. DO check if buttons are ENABLED before clicking
+    8. DON'T fill fields marked 🔒 SKIP (already filled)
+    9. DO use Y-position to differentiate duplicate field names
+
+    🎯 DECISION TREE FOR NEXT ACTION:
+
+    1️ If NOT in creation section yet:
+    → Navigate using "🧭 NAVIGATION" or "CREATE" buttons
+    → Example: Click "+", then "New repository"
+
+    2️ If in creation flow but required fields empty:
+    → Fill name/title field first (REQUIRED)
+    → Then fill description if needed (optional)
+
+    3️ If required fields filled AND choices visible (visibility/template):
+    → Make choice if not default
+    → Mark choice_made = True
+
+    4️ If everything filled AND intermediate button visible:
+    → Click "Continue" or "Next"
+    → Advance to next step
+
+    5️ If everything ready AND final submit button ENABLED:
+    → Click "Create repository" / "Create project" / etc.
+    → This completes the task
+
+    6️ If entity visible in new URL or UI:
+    → Mark complete
+
+    GITHUB-SPECIFIC TIPS:
+    - Repository name must be unique in your account
+    - Repository names can contain letters, numbers, hyphens, underscores
+    - Public repos are visible to everyone, Private repos need permission
+    - README/gitignore/license are optional - can be added later
+    - Projects can be created at user or org level
+    - Issues/PRs require being in a repository first
+
+    COMMON GITHUB PATTERNS:
+    - "+" button in top-right → Opens dropdown with "New repository", "Import repository", "New gist"
+    - Repository page → "Issues" tab → "New issue" button
+    - Repository page → "Pull requests" tab → "New pull request" button
+    - User profile → "Projects" tab → "New project" button
+    - Organization page → "New repository" button prominent
+    """
+
+# Per-step GitHub state, sent in the user message alongside the UI sections
+GITHUB_STATE_TMPL = string.Template("""
+    GITHUB STATE:
+    - Task Entity: ${task_entity_label}
+    - Current Section: ${current_section}
+    - Dialog Open: ${has_dialog}
+    - Choice Made: ${choice_made}
+    - In Flow: ${in_creation_flow}
+
+    WHAT I SEE RIGHT NOW:
+    - Create buttons: ${create_count} visible
+    - Name fields: ${name_field_count} visible
+    - Visibility options: ${visibility_count} visible
+    - Repo settings: ${repo_settings_count} visible
+    - Template choices: ${template_count} visible
+    - Intermediate buttons: ${intermediate_count} visible
+    - Final submit buttons: ${submit_count} visible
+    """)
+
+# Linear-specific workflow (UNCHANGED)
+LINEAR_WORKFLOW = """
+    LINEAR-SPECIFIC WORKFLOW (UNCHANGED):
+
+    PHASE 1 - NAVIGATION:
+    - If task mentions PROJECT but section ≠ 'projects' → Navigate
+    - If task mentions ISSUE → Look for "New Issue" button
+
+    PHASE 2 - OPEN FORM:
+    - Click "New Project", "Create Issue", etc.
+
+    PHASE 3 - FILL FIELDS:
+    - Fill EMPTY fields with 🆕 CAN FILL status
+    - Skip fields showing SKIP
+    - Use Y-position to differentiate
+
+    PHASE 4 - SUBMIT:
+    - Click submit button from "✅ FINAL SUBMIT BUTTONS"
+ CRITICAL FOR LINEAR:
+- The SUBMIT button text is just "Create issue" (NOT "Create new issue")
+- "Create new issue" = Opens the form (already done)
+- "Create issue" = Submits the form (final action)
+- Look for exact text "Create issue" in submit buttons section
+- Click "Create issue" to complete task
+    """
+
+# One static system message per app so each planner prompt prefix stays byte-identical (cacheable);
+# pages of other apps get PLANNER_RULES alone
+SYSTEM_PROMPTS = {
+    'github': PLANNER_RULES + "\n" + GITHUB_WORKFLOW,
+    'linear': PLANNER_RULES + "\n" + LINEAR_WORKFLOW
+}
+
+
+# DOM extraction script - installed once per document as window.__agentExtract
+DOM_EXTRACT_SCRIPT = r"""
+(() => {
+    // Selector union - one DOM traversal instead of one per selector
+    const UNION_SEL = [
+        'button', 'a', 'input', 'select', 'textarea',
+        '[role="button"]', '[role="link"]', '[role="menuitem"]',
+        '[role="textbox"]', '[contenteditable="true"]',
+        '[role="combobox"]', '[role="listbox"]', '[role="option"]',
+        'label', 'form', '[data-testid]', '[aria-label]',
+        'nav a', '[role="navigation"] a', '[role="tab"]',
+        '[placeholder]', '[name]', '[type="submit"]',
+        'summary', 'details', '[data-menu-button]',
+        '.btn', '.Button', '[class*="button"]', '[class*="Button"]'
+    ].join(',');
+    const MAX_ELEMENTS = 400;
+    
+    // Elements are returned as rows (arrays) in this column order to keep the CDP payload small
+    const ELEMENT_KEYS = [
+        'tag', 'text', 'innerText', 'type', 'placeholder', 'aria_label', 'aria_placeholder',
+        'name', 'id', 'href', 'className', 'value', 'required', 'contentEditable', 'testId',
+        'dataTarget', 'fieldId', 'elementPurpose', 'position', 'isVisible', 'isInput', 'isButton',
+        'isNavigation', 'isCreateButton', 'isTemplateChoice', 'isVisibilityChoice', 'isRepoSetting',
+        'isContentEditable', 'disabled', 'hasValue'
+    ];
+    
+    // Keyword lists compiled once per document (substring semantics, like includes())
+    // Navigation keywords - GitHub specific
+    const NAV_RE = /repositories|issues|pull requests|projects|discussions|actions|packages|security|insights|settings|code|commits|branches|wiki|marketplace|explore|topics|trending|your repositories|your projects|your organizations|dashboard|profile|stars|gists/;
+    // Creation/Action keywords - GitHub specific
+    const CREATE_RE = /new repository|new issue|new pull request|new discussion|create repository|add project|create project|create issue|new gist|import repository|new organization|create|add file|upload files|create new file|\+|new/;
+    // Template/option selection
+    const TEMPLATE_RE = /template|use this template|choose a template|start from scratch|blank|table|board|roadmap|kanban/;
+    // Visibility/privacy options
+    const VISIBILITY_RE = /public|private|internal|visibility/;
+    // Intermediate action keywords
+    const INTERMEDIATE_RE = /continue|next|proceed|skip|add|choose|select|import/;
+    // Final submit keywords
+    const FINAL_SUBMIT_RE = /create repository|create project|create issue|submit new issue|create pull request|publish|commit changes|propose changes/;
+    // Repository settings
+    const REPO_SETTINGS_RE = /readme|gitignore|license|initialize|add readme|add gitignore|add license/;
+    const CANCEL_RE = /cancel|close|dismiss|back|discard/;
+    
+    return () => {
+        const getVisibleElements = () => {
+            const elements = [];
+            
+            const classifyElement = (el) => {
+                const text = (el.textContent || '').trim().toLowerCase();
+                const ariaLabel = (el.getAttribute('aria-label') || '').toLowerCase();
+                const placeholder = (el.getAttribute('placeholder') || '').toLowerCase();
+                const href = (el.href || '').toLowerCase();
+                const className = (el.className?.toString() || '').toLowerCase();
+                const dataTarget = (el.getAttribute('data-target') || '').toLowerCase();
+                const combined = text + ' ' + ariaLabel + ' ' + href + ' ' + placeholder + ' ' + className + ' ' + dataTarget;
+                
+                // Classify element - checks ordered so most elements exit after one or two tests
+                if (NAV_RE.test(combined) &&
+                    (el.tagName === 'A' || el.getAttribute('role') === 'link' || 
+                     el.getAttribute('role') === 'tab' || el.closest('[role="navigation"]'))) return 'navigation';
+                
+                // Every remaining purpose requires the element not to be a cancel action
+                if (CANCEL_RE.test(combined)) return 'cancel';
+                if (CREATE_RE.test(combined)) return 'create';
+                if (TEMPLATE_RE.test(combined)) return 'template_choice';
+                if (VISIBILITY_RE.test(combined)) return 'visibility_choice';
+                if (REPO_SETTINGS_RE.test(combined)) return 'repo_setting';
+                
+                const isIntermediate = INTERMEDIATE_RE.test(combined);
+                const isFinalSubmit = FINAL_SUBMIT_RE.test(combined);
+                if (isIntermediate && !isFinalSubmit) return 'intermediate';
+                if (isFinalSubmit && !isIntermediate) return 'final_submit';
+                return 'other';
+            };
+            
+            try {
+                for (const el of document.querySelectorAll(UNION_SEL)) {
+                    if (el.offsetParent !== null || el.checkVisibility?.()) {
+                        const rect = el.getBoundingClientRect();
+                        if (rect.top < window.innerHeight && rect.bottom > 0 && 
+                            rect.width > 0 && rect.height > 0) {
+                            
+                            const text = (el.textContent || '').trim();
+                            const innerText = (el.innerText || '').trim();
+                            
+                            const fieldId = [
+                                el.getAttribute('aria-label'),
+                                el.getAttribute('placeholder'),
+                                el.getAttribute('aria-placeholder'),
+                                el.getAttribute('name'),
+                                el.getAttribute('id'),
+                                el.getAttribute('data-testid'),
+                                el.getAttribute('data-target'),
+                                el.closest('label')?.textContent?.trim().substring(0, 30)
+                            ].filter(x => x).join('|') || text.substring(0, 30);
+                            
+                            const isButton = el.tagName === 'BUTTON' || 
+                                            el.getAttribute('role') === 'button' ||
+                                            (el.tagName === 'A' && el.href && el.href !== '#') ||
+                                            (el.tagName === 'SUMMARY') ||
+                                            el.classList.contains('btn') ||
+                                            el.classList.contains('Button');
+                            
+                            const elementPurpose = classifyElement(el);
+                            
+                            // Row order must match ELEMENT_KEYS
+                            elements.push([
+                                el.tagName.toLowerCase(),
+                                text.substring(0, 150),
+                                innerText.substring(0, 150),
+                                el.type || el.getAttribute('role') || '',
+                                el.placeholder || el.getAttribute('placeholder') || '',
+                                el.getAttribute('aria-label') || '',
+                                el.getAttribute('aria-placeholder') || '',
+                                el.name || '',
+                                el.id || '',
+                                el.href || '',
+                                el.className?.toString().substring(0, 150) || '',
+                                el.value || (el.textContent || '').trim().substring(0, 100),
+                                el.required || false,
+                                el.contentEditable === 'true',
+                                el.getAttribute('data-testid') || '',
+                                el.getAttribute('data-target') || '',
+                                fieldId,
+                                elementPurpose,
+                                {
+                                    x: Math.round(rect.x),
+                                    y: Math.round(rect.y),
+                                    width: Math.round(rect.width),
+                                    height: Math.round(rect.height)
+                                },
+                                true,
+                                ['INPUT', 'TEXTAREA', 'SELECT'].includes(el.tagName) || 
+                                    el.contentEditable === 'true' ||
+                                    el.getAttribute('role') === 'textbox',
+                                isButton,
+                                elementPurpose === 'navigation',
+                                elementPurpose === 'create',
+                                elementPurpose === 'template_choice',
+                                elementPurpose === 'visibility_choice',
+                                elementPurpose === 'repo_setting',
+                                el.contentEditable === 'true',
+                                el.disabled || el.getAttribute('aria-disabled') === 'true',
+                                !!(el.value || (el.contentEditable === 'true' && el.textContent?.trim()))
+                            ]);
+                            
+                            if (elements.length >= MAX_ELEMENTS) break;
+                        }
+                    }
+                }
+            } catch (e) {
+                console.error('Error processing selectors:', e);
+            }
+            
+            return elements;
+        };
+        
+        const detectDialogs = () => {
+            const dialogs = [];
+            document.querySelectorAll('[role="dialog"], [role="modal"], .modal, .dialog, [class*="Modal"], [class*="Dialog"]').forEach(el => {
+                if (el.offsetParent !== null) {
+                    const rect = el.getBoundingClientRect();
+                    dialogs.push({
+                        text: el.textContent.substring(0, 500),
+                        position: { x: rect.x, y: rect.y, width: rect.width, height: rect.height },
+                        aria_label: el.getAttribute('aria-label') || '',
+                        isVisible: true
+                    });
+                }
+            });
+            return dialogs;
+        };
+        
+        const detectCurrentSection = () => {
+            const url = window.location.href.toLowerCase();
+            const pathname = window.location.pathname.toLowerCase();
+            
+            if (url.includes('github.com')) {
+                if (pathname.includes('/new')) return 'creating_new';
+                if (pathname.includes('/issues')) return 'issues';
+                if (pathname.includes('/pull')) return 'pull_requests';
+                if (pathname.includes('/projects')) return 'projects';
+                if (pathname.includes('/settings')) return 'settings';
+                if (pathname.includes('/actions')) return 'actions';
+                if (pathname === '/' || pathname === '') return 'dashboard';
+                if (pathname.split('/').length === 3) return 'repository';
+                return 'github_main';
+            }
+            
+            if (url.includes('linear.app')) {
+                if (url.includes('/project')) return 'projects';
+                if (url.includes('/issue')) return 'issues';
+                if (url.includes('/settings')) return 'settings';
+                if (url.includes('/team')) return 'team';
+                return 'linear_main';
+            }
+            
+            return 'unknown';
+        };
+        
+        const isGitHub = window.location.href.includes('github.com');
+        
+        return {
+            url: window.location.href,
+            title: document.title,
+            currentSection: detectCurrentSection(),
+            elementKeys: ELEMENT_KEYS,
+            elementRows: getVisibleElements(),
+            dialogs: detectDialogs(),
+            hasDialog: document.querySelectorAll('[role="dialog"], [role="modal"]').length > 0,
+            focusedElement: document.activeElement?.tagName?.toLowerCase() || 'none',
+            isGitHub: isGitHub,
+            isLinear: window.location.href.includes('linear.app')
+        };
+    };
+})()
+"""
+
+DOM_EXTRACT_INIT_SCRIPT = "window.__agentExtract = " + DOM_EXTRACT_SCRIPT.strip() + ";"
+
+
+def creation_url_predicate(app_name: str, task_lower: str, initial_url: str) -> Optional[Callable[[str], bool]]:
+    """URL test for the page shown after creating the task's entity (None if the app/task has no known pattern)"""
+    if app_name.lower() != 'github':
+        # Only GitHub navigates to the created entity; Linear's submit just closes a modal
+        return None
+    if 'project' in task_lower:
+        # For projects, URL should change from /projects/new to /users/{user}/projects/{number}
+        return lambda url: '/projects/' in url and '/new' not in url and url != initial_url
+    if 'repository' in task_lower or 'repo' in task_lower:
+        # For repos, URL should be /{user}/{repo-name}
+        return lambda url: url.count('/') >= 4 and '/new' not in url
+    if 'issue' in task_lower:
+        # For issues, URL should be /{user}/{repo}/issues/{number}
+        return lambda url: '/issues/' in url and url.count('/') >= 5 and '/new' not in url
+    return None
+
+
+@lru_cache(maxsize=64)
+def detect_task_entity(task_lower: str) -> Optional[str]:
+    """Map a lowercased task to the entity it targets (task is constant across steps)"""
+    return next((tag for kw, tag in TASK_ENTITY_KEYWORDS if kw in task_lower), None)
+
+
 @dataclass
 class UIState:
     """Represents a captured UI state"""
@@ -23,7 +866,7 @@ class UIState:
     screenshot_path: str
     url: str
     timestamp: str
-    actions_taken: List[str]
+    actions_taken_upto: int  # prefix length of the workflow's actions_taken at capture time
     dom_snapshot: Optional[str] = None
 
 
@@ -36,36 +879,60 @@ class TaskWorkflow:
     states: List[UIState]
     total_steps: int
     completion_status: str
+    actions_taken: List[str] = dataclasses.field(default_factory=list)
+
+
+class ElementView(Mapping):
+    """Read-only dict view over one row of the columnar DOM payload"""
+    __slots__ = ('_index', '_row')
+    
+    def __init__(self, index: Dict[str, int], row: List[Any]):
+        self._index = index
+        self._row = row
+    
+    def __getitem__(self, key: str) -> Any:
+        return self._row[self._index[key]]
+    
+    def __iter__(self):
+        return iter(self._index)
+    
+    def __len__(self) -> int:
+        return len(self._index)
 
 
 class FormFieldTracker:
     """Tracks which fields have been filled to avoid repetition"""
     
+    # Vertical bucket size for telling apart fields that share an id/purpose
+    POSITION_BUCKET_PX = 100
+    
     def __init__(self):
-        self.filled_fields = {}
-        self.field_attempts = {}
+        self.filled_fields: Dict[Tuple[str, str, int], str] = {}
+        self.field_attempts: Dict[Tuple[str, str, int], int] = {}
         self.filled_positions = set()
         self.content_created = False
         self.choice_made = False
         self.in_creation_flow = False
     
-    def create_field_key(self, field_id: str, purpose: str, position_y: int = 0) -> str:
-        """Create unique field key using ID, purpose, and position"""
-        return f"{field_id}|{purpose}|{position_y//100}"
+    def create_field_key(self, field_id: str, purpose: str, position_y: int = 0) -> Tuple[str, str, int]:
+        """Create unique field key using ID, purpose, and position bucket"""
+        # Interned parts let repeated key lookups hit the identity fast path
+        return (sys.intern(field_id), sys.intern(purpose), position_y // self.POSITION_BUCKET_PX)
     
     def mark_filled(self, field_id: str, purpose: str, value: str, position_y: int = 0):
         """Mark a field as filled with position tracking"""
         field_key = self.create_field_key(field_id, purpose, position_y)
         self.filled_fields[field_key] = value
         self.field_attempts[field_key] = self.field_attempts.get(field_key, 0) + 1
-        self.filled_positions.add(position_y // 100)
-        print(f"    Marked filled: {field_key}")
+        self.filled_positions.add(field_key[2])
+        print(f"    Marked filled: {field_id}|{purpose}|{field_key[2]}")
     
     def is_filled(self, field_id: str, purpose: str, position_y: int = 0) -> bool:
         """Check if field was already filled"""
         field_key = self.create_field_key(field_id, purpose, position_y)
         result = field_key in self.filled_fields
-        print(f"    Checking if filled: {field_key} → {result}")
+        if DEBUG:
+            print(f"    Checking if filled: {field_id}|{purpose}|{field_key[2]} → {result}")
         return result
     
     def get_attempts(self, field_id: str, purpose: str, position_y: int = 0) -> int:
@@ -84,43 +951,182 @@ class FormFieldTracker:
         self.in_creation_flow = False
 
 
+# "Step N: " prefix of an action summary - dropped when comparing actions across steps
+STEP_PREFIX_RE = re.compile(r"^Step \d+: ")
+
+
+def action_label(action_plan: Dict[str, Any]) -> str:
+    """Action and target as recorded in the step history, e.g. 'click - New repository'"""
+    label = action_plan.get('action', 'wait')
+    if action_plan.get('target'):
+        label += f" - {action_plan['target'][:50]}"
+    return label
+
+
+class LLMResponseCache:
+    """Caches planner decisions for structurally identical UI states"""
+    
+    def __init__(self, ttl_seconds: int = 3600):
+        self.ttl_seconds = ttl_seconds
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def make_key(
+        self, app_name: str, task: str, dom_data: Dict[str, Any], tracker: FormFieldTracker, last_action: str = ''
+    ) -> str:
+        """Fingerprint app, section, element purposes/ids, tracker state and the last action/outcome"""
+        elements = sorted(
+            (el.get('elementPurpose', 'other'), el.get('fieldId', '')[:40])
+            for el in dom_data.get('elements', [])
+        )
+        raw = _dumps([
+            app_name,
+            task,
+            dom_data.get('currentSection', 'unknown'),
+            elements,
+            sorted(tracker.filled_fields),
+            tracker.choice_made,
+            tracker.in_creation_flow,
+            tracker.content_created,
+            last_action
+        ])
+        return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+    
+    def make_retry_key(self, task: str, page_hash: bytes, url: str, tracker: FormFieldTracker) -> str:
+        """Exact-page key (page hash, URL, tracker state) for retrying a plan after it failed"""
+        raw = _dumps([
+            task,
+            page_hash.hex(),
+            url,
+            sorted(tracker.filled_fields),
+            tracker.choice_made,
+            tracker.in_creation_flow,
+            tracker.content_created
+        ])
+        return "retry:" + hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+    
+    def get(self, key: str, last_action: str = '') -> Optional[Dict[str, Any]]:
+        """Return a cached decision if present, not expired and not a repeat of the last action"""
+        entry = self.entries.get(key)
+        if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+            # Replaying the action that just ran would loop when it left the structure unchanged
+            if last_action.startswith(action_label(entry[1]) + ' ->'):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(entry[1])
+        if entry:
+            del self.entries[key]
+        self.misses += 1
+        return None
+    
+    def put(self, key: str, decision: Dict[str, Any]):
+        """Store a parsed planner decision"""
+        self.entries[key] = (time.monotonic(), dict(decision))
+    
+    def stats(self) -> Dict[str, int]:
+        """Get hit/miss counters"""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
+
+
+class JsonObjectTracker:
+    """Detects when a streamed top-level JSON object has closed"""
+    
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+    
+    def feed(self, text: str) -> bool:
+        """Consume a chunk; return True once the outermost object is complete"""
+        for ch in text:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == '\\':
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = self.started
+            elif ch == '{':
+                self.depth += 1
+                self.started = True
+            elif ch == '}' and self.started:
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+        return False
+
+
 class UniversalUIAgent:
     """Universal UI Navigator - Works with Linear AND GitHub"""
     
     def __init__(self, screenshots_dir: str = "./screenshots"):
-        load_dotenv()
-        
-        openai_api_key = os.getenv("OPENAI_API_KEY")
-        if not openai_api_key:
-            raise ValueError("OPENAI_API_KEY not found in .env file")
-        
-        self.client = OpenAI(api_key=openai_api_key)
+        self.client = type(self)._client()
         self.screenshots_dir = Path(screenshots_dir)
         self.screenshots_dir.mkdir(exist_ok=True)
+        self._screens_str = str(self.screenshots_dir)
         self.browser: Optional[Browser] = None
         self.page: Optional[Page] = None
         self.field_tracker = FormFieldTracker()
+        self.llm_cache = LLMResponseCache()
+        self._dom_json_cache: Tuple[Optional[Dict[str, Any]], str, bytes] = (None, "", b"")
+        self._sections_cache: Tuple[Optional[tuple], Tuple[str, str]] = (None, ("", ""))
         
         print("Agent initialized")
+    
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _client(cls) -> OpenAI:
+        """Load .env and build the OpenAI client once per process"""
+        load_dotenv()
+        
+        openai_api_key = os.getenv("OPENAI_API_KEY")
+        if not openai_api_key:
+            raise ValueError("OPENAI_API_KEY not found in .env file")
+        
+        return OpenAI(api_key=openai_api_key)
 
         
-    async def initialize_browser(self, headless: bool = False):
-        """Initialize Playwright browser"""
+    async def initialize_browser(self, headless: bool = False, minimal: bool = True, fast_mode: bool = False):
+        """Initialize Playwright browser (minimal=False leaves sync, hyperlink-auditing pings and audio on,
+        fast_mode=True blocks fonts/media/trackers but bypasses the HTTP cache)"""
         playwright = await async_playwright().start()
         
+        args = ['--disable-blink-features=AutomationControlled']
+        if minimal:
+            args.extend(MINIMAL_CHROMIUM_ARGS)
+        
         user_data_dir = "./browser_data"
         context = await playwright.chromium.launch_persistent_context(
             user_data_dir,
             headless=headless,
             viewport={'width': 1920, 'height': 1080},
             user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            args=['--disable-blink-features=AutomationControlled']
+            args=args
         )
         
+        await context.add_init_script(DOM_EXTRACT_INIT_SCRIPT)
+        
+        if fast_mode:
+            await context.route("**/*", self._route_filter)
+            print("⚡ Fast mode: blocking fonts, media and trackers (icon fonts may render as boxes)")
+        
         self.browser = context
         self.page = context.pages[0] if context.pages else await context.new_page()
         print("✅ Browser initialized")
         
+    async def _route_filter(self, route):
+        """Abort fonts, media and tracker requests; let everything else through"""
+        request = route.request
+        if request.resource_type in BLOCKED_RESOURCE_TYPES or any(host in request.url for host in TRACKER_HOSTS):
+            await route.abort()
+        else:
+            await route.continue_()
+    
     async def close_browser(self):
         """Close browser"""
         if self.browser:
@@ -133,275 +1139,57 @@ class UniversalUIAgent:
         print("LOGIN REQUIRED - Please login in the browser")
         print(f"{'='*60}\n")
         
-        login_keywords = ['login', 'signin', 'auth', 'oauth', 'sessions/verified']
-        start_time = datetime.now()
-        
-        while (datetime.now() - start_time).seconds < timeout:
-            current_url = self.page.url.lower()
-            is_login = any(kw in current_url for kw in login_keywords)
-            
-            if not is_login:
-                print(f"✅ Login successful: {self.page.url}")
-                await self.page.wait_for_timeout(3000)
-                return True
-            
-            await self.page.wait_for_timeout(2000)
+        # Wake on the navigation that leaves the login page instead of polling
+        try:
+            await self.page.wait_for_url(lambda url: not LOGIN_RE.search(url), timeout=timeout * 1000)
+        except PlaywrightTimeoutError:
+            if LOGIN_RE.search(self.page.url):
+                return False
+        except Exception as e:
+            print(f"⚠️ Navigation wait failed ({str(e)[:50]}), polling instead")
+            return await self._poll_for_login(timeout)
         
-        return False
-    
-    async def capture_screenshot(self, step_num: int, description: str) -> str:
-        """Capture screenshot"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"step_{step_num}_{timestamp}.png"
-        filepath = self.screenshots_dir / filename
-        await self.page.screenshot(path=str(filepath), full_page=False)
-        return str(filepath)
-    
-    async def get_comprehensive_dom_context(self) -> Dict[str, Any]:
-        """Extract comprehensive DOM context - UNIVERSAL for any app"""
-        dom_script = """
-        () => {
-            const getVisibleElements = () => {
-                const selectors = [
-                    'button', 'a', 'input', 'select', 'textarea',
-                    '[role="button"]', '[role="link"]', '[role="menuitem"]',
-                    '[role="textbox"]', '[contenteditable="true"]',
-                    '[role="combobox"]', '[role="listbox"]', '[role="option"]',
-                    'label', 'form', '[data-testid]', '[aria-label]',
-                    'nav a', '[role="navigation"] a', '[role="tab"]',
-                    '[placeholder]', '[name]', '[type="submit"]',
-                    'summary', 'details', '[data-menu-button]',
-                    '.btn', '.Button', '[class*="button"]', '[class*="Button"]'
-                ];
-                
-                const elements = [];
-                const seenElements = new Set();
-                
-                const classifyElement = (el) => {
-                    const text = (el.textContent || '').trim().toLowerCase();
-                    const ariaLabel = (el.getAttribute('aria-label') || '').toLowerCase();
-                    const placeholder = (el.getAttribute('placeholder') || '').toLowerCase();
-                    const href = (el.href || '').toLowerCase();
-                    const className = (el.className?.toString() || '').toLowerCase();
-                    const dataTarget = (el.getAttribute('data-target') || '').toLowerCase();
-                    const combined = text + ' ' + ariaLabel + ' ' + href + ' ' + placeholder + ' ' + className + ' ' + dataTarget;
-                    
-                    // Navigation keywords - GitHub specific
-                    const navKeywords = ['repositories', 'issues', 'pull requests', 'projects', 
-                                        'discussions', 'actions', 'packages', 'security',
-                                        'insights', 'settings', 'code', 'commits', 'branches',
-                                        'wiki', 'marketplace', 'explore', 'topics', 'trending',
-                                        'your repositories', 'your projects', 'your organizations',
-                                        'dashboard', 'profile', 'stars', 'gists'];
-                    
-                    // Creation/Action keywords - GitHub specific
-                    const createKeywords = ['new repository', 'new issue', 
-                                          'new pull request', 'new discussion', 'create repository','add project',
-                                          'create project', 'create issue', 'new gist', 'import repository',
-                                          'new organization', 'create', 'add file', 'upload files',
-                                          'create new file', '+', 'new'];
-                    
-                    // Template/option selection
-                    const templateKeywords = ['template', 'use this template', 'choose a template',
-                                            'start from scratch', 'blank', 'table', 'board', 
-                                            'roadmap', 'kanban'];
-                    
-                    // Visibility/privacy options
-                    const visibilityKeywords = ['public', 'private', 'internal', 'visibility'];
-                    
-                    // Intermediate action keywords
-                    const intermediateKeywords = ['continue', 'next', 'proceed', 'skip', 'add', 
-                                                'choose', 'select', 'import'];
-                    
-                    // Final submit keywords
-                    const finalSubmitKeywords = ['create repository', 'create project', 'create issue',
-                                               'submit new issue', 'create pull request', 'publish',
-                                                'commit changes', 'propose changes'];
-                    
-                    // Repository settings
-                    const repoSettingsKeywords = ['readme', 'gitignore', 'license', 'initialize',
-                                                'add readme', 'add gitignore', 'add license'];
-                    
-                    const cancelKeywords = ['cancel', 'close', 'dismiss', 'back', 'discard'];
-                    
-                    // Classify element
-                    const isNav = navKeywords.some(kw => combined.includes(kw)) && 
-                                  (el.tagName === 'A' || el.getAttribute('role') === 'link' || 
-                                   el.getAttribute('role') === 'tab' || el.closest('[role="navigation"]'));
-                    
-                    const isCreate = createKeywords.some(kw => combined.includes(kw)) && 
-                                   !cancelKeywords.some(kw => combined.includes(kw));
-                    
-                    const isTemplate = templateKeywords.some(kw => combined.includes(kw));
-                    const isVisibility = visibilityKeywords.some(kw => combined.includes(kw));
-                    const isRepoSetting = repoSettingsKeywords.some(kw => combined.includes(kw));
-                    const isIntermediate = intermediateKeywords.some(kw => combined.includes(kw)) &&
-                                         !finalSubmitKeywords.some(kw => combined.includes(kw)) &&
-                                         !cancelKeywords.some(kw => combined.includes(kw));
-                    const isFinalSubmit = finalSubmitKeywords.some(kw => combined.includes(kw)) &&
-                                        !intermediateKeywords.some(kw => combined.includes(kw)) &&
-                                        !cancelKeywords.some(kw => combined.includes(kw));
-                    const isCancel = cancelKeywords.some(kw => combined.includes(kw));
-                    
-                    let purpose = 'other';
-                    if (isNav) purpose = 'navigation';
-                    else if (isCreate && !isCancel) purpose = 'create';
-                    else if (isTemplate && !isCancel) purpose = 'template_choice';
-                    else if (isVisibility && !isCancel) purpose = 'visibility_choice';
-                    else if (isRepoSetting && !isCancel) purpose = 'repo_setting';
-                    else if (isIntermediate && !isCancel) purpose = 'intermediate';
-                    else if (isFinalSubmit && !isCancel) purpose = 'final_submit';
-                    else if (isCancel) purpose = 'cancel';
-                    
-                    return purpose;
-                };
-                
-                selectors.forEach(sel => {
-                    try {
-                        document.querySelectorAll(sel).forEach(el => {
-                            if (seenElements.has(el)) return;
-                            
-                            if (el.offsetParent !== null || el.checkVisibility?.()) {
-                                const rect = el.getBoundingClientRect();
-                                if (rect.top < window.innerHeight && rect.bottom > 0 && 
-                                    rect.width > 0 && rect.height > 0) {
-                                    
-                                    const text = (el.textContent || '').trim();
-                                    const innerText = (el.innerText || '').trim();
-                                    
-                                    const fieldId = [
-                                        el.getAttribute('aria-label'),
-                                        el.getAttribute('placeholder'),
-                                        el.getAttribute('aria-placeholder'),
-                                        el.getAttribute('name'),
-                                        el.getAttribute('id'),
-                                        el.getAttribute('data-testid'),
-                                        el.getAttribute('data-target'),
-                                        el.closest('label')?.textContent?.trim().substring(0, 30)
-                                    ].filter(x => x).join('|') || text.substring(0, 30);
-                                    
-                                    const isButton = el.tagName === 'BUTTON' || 
-                                                    el.getAttribute('role') === 'button' ||
-                                                    (el.tagName === 'A' && el.href && el.href !== '#') ||
-                                                    (el.tagName === 'SUMMARY') ||
-                                                    el.classList.contains('btn') ||
-                                                    el.classList.contains('Button');
-                                    
-                                    const elementPurpose = classifyElement(el);
-                                    
-                                    elements.push({
-                                        tag: el.tagName.toLowerCase(),
-                                        text: text.substring(0, 150),
-                                        innerText: innerText.substring(0, 150),
-                                        type: el.type || el.getAttribute('role') || '',
-                                        placeholder: el.placeholder || el.getAttribute('placeholder') || '',
-                                        aria_label: el.getAttribute('aria-label') || '',
-                                        aria_placeholder: el.getAttribute('aria-placeholder') || '',
-                                        name: el.name || '',
-                                        id: el.id || '',
-                                        href: el.href || '',
-                                        className: el.className?.toString().substring(0, 150) || '',
-                                        value: el.value || (el.textContent || '').trim().substring(0, 100),
-                                        required: el.required || false,
-                                        contentEditable: el.contentEditable === 'true',
-                                        testId: el.getAttribute('data-testid') || '',
-                                        dataTarget: el.getAttribute('data-target') || '',
-                                        fieldId: fieldId,
-                                        elementPurpose: elementPurpose,
-                                        position: {
-                                            x: Math.round(rect.x),
-                                            y: Math.round(rect.y),
-                                            width: Math.round(rect.width),
-                                            height: Math.round(rect.height)
-                                        },
-                                        isVisible: true,
-                                        isInput: ['INPUT', 'TEXTAREA', 'SELECT'].includes(el.tagName) || 
-                                                 el.contentEditable === 'true' ||
-                                                 el.getAttribute('role') === 'textbox',
-                                        isButton: isButton,
-                                        isNavigation: elementPurpose === 'navigation',
-                                        isCreateButton: elementPurpose === 'create',
-                                        isTemplateChoice: elementPurpose === 'template_choice',
-                                        isVisibilityChoice: elementPurpose === 'visibility_choice',
-                                        isRepoSetting: elementPurpose === 'repo_setting',
-                                        isContentEditable: el.contentEditable === 'true',
-                                        disabled: el.disabled || el.getAttribute('aria-disabled') === 'true',
-                                        hasValue: !!(el.value || (el.contentEditable === 'true' && el.textContent?.trim()))
-                                    });
-                                    
-                                    seenElements.add(el);
-                                }
-                            }
-                        });
-                    } catch (e) {
-                        console.error('Error processing selector:', sel, e);
-                    }
-                });
-                
-                return elements.slice(0, 400);
-            };
-            
-            const detectDialogs = () => {
-                const dialogs = [];
-                document.querySelectorAll('[role="dialog"], [role="modal"], .modal, .dialog, [class*="Modal"], [class*="Dialog"]').forEach(el => {
-                    if (el.offsetParent !== null) {
-                        const rect = el.getBoundingClientRect();
-                        dialogs.push({
-                            text: el.textContent.substring(0, 500),
-                            position: { x: rect.x, y: rect.y, width: rect.width, height: rect.height },
-                            aria_label: el.getAttribute('aria-label') || '',
-                            isVisible: true
-                        });
-                    }
-                });
-                return dialogs;
-            };
-            
-            const detectCurrentSection = () => {
-                const url = window.location.href.toLowerCase();
-                const pathname = window.location.pathname.toLowerCase();
-                
-                if (url.includes('github.com')) {
-                    if (pathname.includes('/new')) return 'creating_new';
-                    if (pathname.includes('/issues')) return 'issues';
-                    if (pathname.includes('/pull')) return 'pull_requests';
-                    if (pathname.includes('/projects')) return 'projects';
-                    if (pathname.includes('/settings')) return 'settings';
-                    if (pathname.includes('/actions')) return 'actions';
-                    if (pathname === '/' || pathname === '') return 'dashboard';
-                    if (pathname.split('/').length === 3) return 'repository';
-                    return 'github_main';
-                }
-                
-                if (url.includes('linear.app')) {
-                    if (url.includes('/project')) return 'projects';
-                    if (url.includes('/issue')) return 'issues';
-                    if (url.includes('/settings')) return 'settings';
-                    if (url.includes('/team')) return 'team';
-                    return 'linear_main';
-                }
-                
-                return 'unknown';
-            };
-            
-            const isGitHub = window.location.href.includes('github.com');
+        print(f"✅ Login successful: {self.page.url}")
+        await self.page.wait_for_timeout(3000)
+        return True
+    
+    async def _poll_for_login(self, timeout: int) -> bool:
+        """Fallback: poll the page URL until it leaves the login flow"""
+        start_time = datetime.now()
+        
+        while (datetime.now() - start_time).seconds < timeout:
+            if not LOGIN_RE.search(self.page.url):
+                print(f"✅ Login successful: {self.page.url}")
+                await self.page.wait_for_timeout(3000)
+                return True
             
-            return {
-                url: window.location.href,
-                title: document.title,
-                currentSection: detectCurrentSection(),
-                elements: getVisibleElements(),
-                dialogs: detectDialogs(),
-                hasDialog: document.querySelectorAll('[role="dialog"], [role="modal"]').length > 0,
-                focusedElement: document.activeElement?.tagName?.toLowerCase() || 'none',
-                isGitHub: isGitHub,
-                isLinear: window.location.href.includes('linear.app')
-            };
-        }
-        """
+            await self.page.wait_for_timeout(2000)
         
+        return False
+    
+    async def capture_screenshot(self, step_num: int, description: str) -> str:
+        """Capture screenshot (JPEG per step, lossless PNG for final states)"""
+        timestamp = time.time_ns() // 1_000_000_000
+        if 'final' in description.lower():
+            filepath = f"{self._screens_str}/step_{step_num}_{timestamp}.png"
+            image = await self.page.screenshot(full_page=False)
+        else:
+            filepath = f"{self._screens_str}/step_{step_num}_{timestamp}.jpg"
+            image = await self.page.screenshot(full_page=False, type="jpeg", quality=SCREENSHOT_JPEG_QUALITY)
+        # Write off the event loop so the next DOM/LLM work is not blocked on disk
+        await asyncio.to_thread(Path(filepath).write_bytes, image)
+        return filepath
+    
+    async def get_comprehensive_dom_context(self) -> Dict[str, Any]:
+        """Extract comprehensive DOM context - UNIVERSAL for any app"""
         try:
-            dom_data = await self.page.evaluate(dom_script)
+            # Installed by the context init script; fall back to shipping the source if missing
+            dom_data = await self.page.evaluate("() => window.__agentExtract ? window.__agentExtract() : null")
+            if dom_data is None:
+                dom_data = await self.page.evaluate(DOM_EXTRACT_SCRIPT)
+            
+            key_index = {key: i for i, key in enumerate(dom_data.pop('elementKeys'))}
+            dom_data['elements'] = [ElementView(key_index, row) for row in dom_data.pop('elementRows')]
             return dom_data
         except Exception as e:
             print(f"DOM extraction error: {e}")
@@ -416,33 +1204,76 @@ class UniversalUIAgent:
         dom_data: Dict[str, Any],
         previous_actions: List[str],
         consecutive_failures: int
-    ) -> str:
-        """Create intelligent prompt - UNIVERSAL, learns from UI"""
-        
-        task_lower = task.lower()
-        task_entity = None
-        if 'repository' in task_lower or 'repo' in task_lower:
-            task_entity = 'repository'
-        elif 'project' in task_lower:
-            task_entity = 'project'
-        elif 'issue' in task_lower:
-            task_entity = 'issue'
-        elif 'pull request' in task_lower or 'pr' in task_lower:
-            task_entity = 'pull_request'
-        elif 'discussion' in task_lower:
-            task_entity = 'discussion'
-        elif 'gist' in task_lower:
-            task_entity = 'gist'
+    ) -> Tuple[str, str]:
+        """Create (system, user) prompt pair - UNIVERSAL, learns from UI"""
         
         # Get filled fields info
         filled_info = []
         if self.field_tracker.filled_fields:
-            for field_key, value in list(self.field_tracker.filled_fields.items())[:10]:
-                parts = field_key.split('|')
-                display_key = '|'.join(parts[:2]) if len(parts) >= 2 else field_key
+            for (field_id, purpose, _), value in list(self.field_tracker.filled_fields.items())[:10]:
+                display_key = f"{field_id}|{purpose}"
                 filled_info.append(f"  - '{display_key[:40]}' = '{value[:40]}'")
         filled_summary = "\n".join(filled_info) if filled_info else "  None"
         
+        task_context, ui_sections, dom_json = self._build_page_sections(task, dom_data)
+        
+        prompt = f"""TASK: "{task}"
+
+    {task_context}
+
+    CURRENT STATE:
+    - Step: {current_step}
+    - Previous Actions: {_dumps(previous_actions[-5:]) if previous_actions else "None"}
+    - Consecutive Failures: {consecutive_failures}
+
+    FIELDS ALREADY FILLED:
+    {filled_summary}
+
+    {ui_sections}
+
+    PAGE DATA:
+    {dom_json}"""
+
+        if dom_data.get('isGitHub'):
+            system_prompt = SYSTEM_PROMPTS['github']
+        elif dom_data.get('isLinear'):
+            system_prompt = SYSTEM_PROMPTS['linear']
+        else:
+            system_prompt = PLANNER_RULES
+        
+        return system_prompt, prompt
+    
+    def _page_fingerprint(self, dom_data: Dict[str, Any]) -> Tuple[str, bytes]:
+        """Condensed page JSON and its hash, computed once per DOM snapshot"""
+        cached_dom, dom_json, dom_hash = self._dom_json_cache
+        if cached_dom is not dom_data:
+            summary_json = _dumps(summarize_dom(dom_data))
+            dom_hash = hashlib.blake2b(summary_json.encode(), digest_size=16).digest()
+            dom_json = summary_json[:12000]
+            self._dom_json_cache = (dom_data, dom_json, dom_hash)
+        return dom_json, dom_hash
+    
+    def _build_page_sections(self, task: str, dom_data: Dict[str, Any]) -> Tuple[str, str, str]:
+        """Build (task_context, ui_sections, page_json) for a DOM snapshot, memoized by page fingerprint"""
+        
+        dom_json, dom_hash = self._page_fingerprint(dom_data)
+        
+        # Page-derived sections only change with the page or the tracker state (e.g. on repeated waits)
+        tracker = self.field_tracker
+        sections_key = (
+            dom_hash,
+            task,
+            tuple(tracker.filled_fields),
+            tracker.choice_made,
+            tracker.in_creation_flow,
+            tracker.content_created
+        )
+        if self._sections_cache[0] == sections_key:
+            task_context, ui_sections = self._sections_cache[1]
+            return task_context, ui_sections, dom_json
+        
+        task_entity = detect_task_entity(task.lower())
+        
         # Analyze DOM
         current_section = dom_data.get('currentSection', 'unknown')
         has_dialog = dom_data.get('hasDialog', False) or len(dom_data.get('dialogs', [])) > 0
@@ -450,15 +1281,39 @@ class UniversalUIAgent:
         is_linear = dom_data.get('isLinear', False)
         elements = dom_data.get('elements', [])
         
-        input_fields = [el for el in elements if el.get('isInput')]
-        contenteditable_fields = [el for el in elements if el.get('isContentEditable')]
-        navigation_elements = [el for el in elements if el.get('isNavigation')]
-        create_buttons = [el for el in elements if el.get('isCreateButton')]
-        template_choices = [el for el in elements if el.get('isTemplateChoice')]
-        visibility_choices = [el for el in elements if el.get('isVisibilityChoice')]
-        repo_settings = [el for el in elements if el.get('isRepoSetting')]
-        intermediate_buttons = [el for el in elements if el.get('elementPurpose') == 'intermediate']
-        submit_buttons = [el for el in elements if el.get('elementPurpose') == 'final_submit' and not el.get('disabled')]
+        # Bucket elements in a single pass
+        input_fields = []
+        contenteditable_fields = []
+        navigation_elements = []
+        create_buttons = []
+        template_choices = []
+        visibility_choices = []
+        repo_settings = []
+        intermediate_buttons = []
+        submit_buttons = []
+        name_field_count = 0
+        purpose_buckets = {
+            'navigation': navigation_elements,
+            'create': create_buttons,
+            'template_choice': template_choices,
+            'visibility_choice': visibility_choices,
+            'repo_setting': repo_settings,
+            'intermediate': intermediate_buttons
+        }
+        for el in elements:
+            if el.get('isInput'):
+                input_fields.append(el)
+                field_id_lower = el.get('fieldId', '').lower()
+                if 'name' in field_id_lower or 'title' in field_id_lower:
+                    name_field_count += 1
+            if el.get('isContentEditable'):
+                contenteditable_fields.append(el)
+            purpose = el.get('elementPurpose')
+            bucket = purpose_buckets.get(purpose)
+            if bucket is not None:
+                bucket.append(el)
+            elif purpose == 'final_submit' and not el.get('disabled'):
+                submit_buttons.append(el)
         
         # Build navigation section
         nav_section = "NAVIGATION ELEMENTS:\n"
@@ -504,354 +1359,127 @@ class UniversalUIAgent:
         # Build repo settings
         settings_section = "REPOSITORY SETTINGS (README/gitignore/License):\n"
         if repo_settings:
-            for i, setting in enumerate(repo_settings[:10], 1):
-                text = setting.get('text', '')[:50] or setting.get('aria_label', '')[:50]
-                settings_section += f"{i}. '{text}'\n"
-        else:
-            settings_section += "  No repo settings visible\n"
-        
-        # Build intermediate buttons section
-        intermediate_section = "INTERMEDIATE BUTTONS (Continue/Next/Add):\n"
-        if intermediate_buttons:
-            for i, btn in enumerate(intermediate_buttons[:10], 1):
-                btn_text = btn.get('text', '')[:50] or btn.get('aria_label', '')[:50]
-                btn_disabled = "DISABLED" if btn.get('disabled') else "ENABLED"
-                intermediate_section += f"{i}. {btn_disabled} | '{btn_text}'\n"
-        else:
-            intermediate_section += "  No intermediate buttons found\n"
-        
-        # Build submit buttons section
-        submit_section = "✅ FINAL SUBMIT BUTTONS (Create/Save/Publish):\n"
-        if submit_buttons:
-            submit_section += "  USE EXACT FULL TEXT - Don't use partial words!\n"
-            for i, btn in enumerate(submit_buttons[:10], 1):
-                btn_text = btn.get('text', '')[:50] or btn.get('aria_label', '')[:50]
-                btn_disabled = "DISABLED" if btn.get('disabled') else "ENABLED"
-                submit_section += f"{i}. {btn_disabled} | EXACT TEXT: '{btn_text}'\n"
-        else:
-            submit_section += "  No final submit buttons found (may need intermediate step first)\n"
-        
-        # Build field analysis
-        field_analysis = "📝 INPUT FIELDS:\n"
-        
-        # Show contenteditable if any
-        if contenteditable_fields:
-            field_analysis += "\nCONTENTEDITABLE FIELDS:\n"
-            for i, field in enumerate(contenteditable_fields[:10], 1):
-                field_id = field.get('fieldId', 'unknown')[:50]
-                text = field.get('text', '')[:30]
-                placeholder = field.get('placeholder', '')[:30]
-                aria = field.get('aria_label', '')[:30]
-                pos_y = field.get('position', {}).get('y', 0)
-                status = "HAS CONTENT" if text else "EMPTY"
-                
-                identifiers = []
-                if placeholder: identifiers.append(f"placeholder='{placeholder}'")
-                if aria: identifiers.append(f"aria='{aria}'")
-                
-                identifier_str = " | ".join(identifiers) if identifiers else field_id
-                field_analysis += f"{i}. {status} | Y:{pos_y} | {identifier_str}\n"
-        
-        # Show traditional inputs
-        traditional_inputs = [f for f in input_fields if not f.get('isContentEditable')]
-        if traditional_inputs:
-            field_analysis += "\nINPUT FIELDS:\n"
-            for i, field in enumerate(traditional_inputs[:15], 1):
-                field_id = field.get('fieldId', 'unknown')[:50]
-                field_name = field.get('name', '')
-                field_element_id = field.get('id', '')
-                placeholder = field.get('placeholder', '')[:40]
-                aria = field.get('aria_label', '')[:40]
-                pos_y = field.get('position', {}).get('y', 0)
-                status = "FILLED" if field.get('hasValue') else "EMPTY"
-                
-                combined_text = (placeholder + ' ' + aria + ' ' + field_id).lower()
-                field_purpose = 'other'
-                if any(kw in combined_text for kw in ['name', 'title', 'repository name', 'project name']):
-                    field_purpose = 'name'
-                elif any(kw in combined_text for kw in ['description', 'summary', 'about']):
-                    field_purpose = 'description'
-                
-                try:
-                    is_already_filled = self.field_tracker.is_filled(field_id, field_purpose, pos_y)
-                    already_filled = "SKIP" if is_already_filled else "CAN FILL"
-                except:
-                    already_filled = "CAN FILL"
-                
-                identifiers = []
-                if placeholder: identifiers.append(f"placeholder='{placeholder}'")
-                if aria: identifiers.append(f"aria='{aria}'")
-                if field_element_id: identifiers.append(f"id='{field_element_id}'")
-                if field_name: identifiers.append(f"name='{field_name}'")
-                
-                identifier_str = " | ".join(identifiers) if identifiers else field_id
-                field_analysis += f"{i}. {status} | {already_filled} | Y:{pos_y} | {identifier_str}\n"
-        
-        task_context = f"""
-    🎯 TASK CONTEXT ANALYSIS:
-    - Original Task: "{task}"
-    - Target Entity: {task_entity or 'general'}
-    - Current App: {'GITHUB' if is_github else 'LINEAR' if is_linear else 'UNKNOWN'}
-    - Current Section: {current_section}
-    - Has Dialog Open: {has_dialog}
-    - Choice Made: {self.field_tracker.choice_made}
-    - In Creation Flow: {self.field_tracker.in_creation_flow}
-    - Content Already Created: {self.field_tracker.content_created}
-    """
-        
-        # GITHUB-specific smart workflow
-        github_workflow = ""
-        if is_github:
-            github_workflow = f"""
-    GITHUB WORKFLOW - FULLY DYNAMIC (NO HARDCODING)
-
-    CURRENT STATE ANALYSIS:
-    - Task Entity: {task_entity or 'unknown'}
-    - Current Section: {current_section}
-    - Dialog Open: {has_dialog}
-    - Choice Made: {self.field_tracker.choice_made}
-    - In Flow: {self.field_tracker.in_creation_flow}
-
-    SMART WORKFLOW - LEARN FROM UI ELEMENTS:
-
-    STEP 1️ - NAVIGATE TO CREATION:
-    Current section: {current_section}
-    
-    Common GitHub creation patterns:
-    - Repositories: Click "+" dropdown → "New repository" OR navigate to /new
-    - Projects: Go to /projects → Click "New project"
-    - Issues: In repository → Click "Issues" tab → "New issue"
-    - Pull Requests: In repository → Click "Pull requests" → "New pull request"
-    
-    Look at "CREATE/NEW BUTTONS" section:
-    - Find button matching your task entity ({task_entity})
-    - Common texts: "New repository", "New project", "New issue", "Create repository"
-    - Click to start creation flow
-    - After click → mark in_creation_flow = True
-
-    STEP 2️ - FILL REQUIRED FIELDS (Name/Title):
-    Check "INPUT FIELDS" section above
-    
-    Repository creation typically needs:
-    - Repository name (REQUIRED)
-    - Description (optional)
-    
-    Project creation typically needs:
-    - Project name (REQUIRED)
-    - Description (optional)
-    
-    Issue creation typically needs:
-    - Title (REQUIRED)
-    - Description/Body (optional)
-    
-    Rules:
-    - Fill fields marked "CAN FILL"
-    - Skip fields marked "SKIP"
-    - Use Y-position to differentiate similar fields
-    - Fill in order: name/title first, then description
-
-    STEP 3️ - MAKE CHOICES (if presented):
-    
-    A) Repository Visibility (if creating repo):
-    Check " VISIBILITY OPTIONS" section
-    - Look for "Public" or "Private" radio buttons/options
-    - Default is usually "Public" (already selected)
-    - Click if you need to change it
-    
-    B) Repository Settings (optional):
-    Check "REPOSITORY SETTINGS" section
-    - Add README file (checkbox)
-    - Add .gitignore (dropdown/checkbox)
-    - Choose a license (dropdown)
-    - These are OPTIONAL - GitHub can create repo without them
-    
-    C) Project Template (if creating project):
-    Check " TEMPLATE/OPTION CHOICES" section
-    - Look for: "Table", "Board", "Roadmap", "Blank"
-    - Click desired template
-    - Mark choice_made = True after selection
-
-    STEP 4️ - INTERMEDIATE STEPS:
-    Check " INTERMEDIATE BUTTONS" section
-    - Look for: "Continue", "Next", "Add", "Import"
-    - These advance through multi-step flows
-    - Click if present and enabled
-
-    STEP 5️ - FINAL SUBMIT:
-    Check "FINAL SUBMIT BUTTONS" section
-    - Look for: "Create repository", "Create project", "Create issue"
-    - This is the FINAL action - completes the creation
-    - Must have exact text match (don't click partial matches)
-    - Button should be ENABLED (✅)
-
-    STEP 6 - VERIFY COMPLETION:
-    After clicking final submit:
-    - Check if URL changed to new entity (e.g., /username/repo-name)
-    - Check if dialog closed
-    - Check if success message visible
-    - If yes → set is_complete=true, confidence > 0.8
-
-    CRITICAL DYNAMIC RULES:
-    1. DON'T assume button/field names - READ from UI sections above
-    2. DON'T hardcode selectors - use text/aria-label from elements
-    3. DO adapt to what's visible NOW on the page
-    4. DO track state with choice_made and in_creation_flow
-    5. DON'T confuse intermediate buttons with final submit
-    6. DO use exact text from "✅FINAL SUBMIT BUTTONS" section
-    7. DO check if buttons are ENABLED before clicking
-    8. DON'T fill fields marked 🔒 SKIP (already filled)
-    9. DO use Y-position to differentiate duplicate field names
-
-    🎯 DECISION TREE FOR NEXT ACTION:
-
-    1️ If NOT in creation section yet:
-    → Navigate using "🧭 NAVIGATION" or "CREATE" buttons
-    → Example: Click "+", then "New repository"
-
-    2️ If in creation flow but required fields empty:
-    → Fill name/title field first (REQUIRED)
-    → Then fill description if needed (optional)
-
-    3️ If required fields filled AND choices visible (visibility/template):
-    → Make choice if not default
-    → Mark choice_made = True
-
-    4️ If everything filled AND intermediate button visible:
-    → Click "Continue" or "Next"
-    → Advance to next step
-
-    5️ If everything ready AND final submit button ENABLED:
-    → Click "Create repository" / "Create project" / etc.
-    → This completes the task
-
-    6️ If entity visible in new URL or UI:
-    → Mark complete
-
-    WHAT I SEE RIGHT NOW:
-    - Create buttons: {len(create_buttons)} visible
-    - Name fields: {len([f for f in input_fields if 'name' in f.get('fieldId', '').lower() or 'title' in f.get('fieldId', '').lower()])} visible
-    - Visibility options: {len(visibility_choices)} visible
-    - Repo settings: {len(repo_settings)} visible
-    - Template choices: {len(template_choices)} visible
-    - Intermediate buttons: {len(intermediate_buttons)} visible
-    - Final submit buttons: {len(submit_buttons)} visible
-
-    GITHUB-SPECIFIC TIPS:
-    - Repository name must be unique in your account
-    - Repository names can contain letters, numbers, hyphens, underscores
-    - Public repos are visible to everyone, Private repos need permission
-    - README/gitignore/license are optional - can be added later
-    - Projects can be created at user or org level
-    - Issues/PRs require being in a repository first
-
-    COMMON GITHUB PATTERNS:
-    - "+" button in top-right → Opens dropdown with "New repository", "Import repository", "New gist"
-    - Repository page → "Issues" tab → "New issue" button
-    - Repository page → "Pull requests" tab → "New pull request" button
-    - User profile → "Projects" tab → "New project" button
-    - Organization page → "New repository" button prominent
-    """
+            for i, setting in enumerate(repo_settings[:10], 1):
+                text = setting.get('text', '')[:50] or setting.get('aria_label', '')[:50]
+                settings_section += f"{i}. '{text}'\n"
+        else:
+            settings_section += "  No repo settings visible\n"
         
-        # Linear-specific workflow (UNCHANGED)
-        linear_workflow = ""
-        if is_linear:
-            linear_workflow = f"""
-    LINEAR-SPECIFIC WORKFLOW (UNCHANGED):
-
-    PHASE 1 - NAVIGATION:
-    - If task mentions PROJECT but section ≠ 'projects' → Navigate
-    - If task mentions ISSUE → Look for "New Issue" button
-
-    PHASE 2 - OPEN FORM:
-    - Click "New Project", "Create Issue", etc.
-
-    PHASE 3 - FILL FIELDS:
-    - Fill EMPTY fields with 🆕 CAN FILL status
-    - Skip fields showing SKIP
-    - Use Y-position to differentiate
-
-    PHASE 4 - SUBMIT:
-    - Click submit button from "✅ FINAL SUBMIT BUTTONS"
- CRITICAL FOR LINEAR:
-- The SUBMIT button text is just "Create issue" (NOT "Create new issue")
-- "Create new issue" = Opens the form (already done)
-- "Create issue" = Submits the form (final action)
-- Look for exact text "Create issue" in submit buttons section
-- Click "Create issue" to complete task
+        # Build intermediate buttons section
+        intermediate_section = "INTERMEDIATE BUTTONS (Continue/Next/Add):\n"
+        if intermediate_buttons:
+            for i, btn in enumerate(intermediate_buttons[:10], 1):
+                btn_text = btn.get('text', '')[:50] or btn.get('aria_label', '')[:50]
+                btn_disabled = "DISABLED" if btn.get('disabled') else "ENABLED"
+                intermediate_section += f"{i}. {btn_disabled} | '{btn_text}'\n"
+        else:
+            intermediate_section += "  No intermediate buttons found\n"
+        
+        # Build submit buttons section
+        submit_section = "✅ FINAL SUBMIT BUTTONS (Create/Save/Publish):\n"
+        if submit_buttons:
+            submit_section += "  USE EXACT FULL TEXT - Don't use partial words!\n"
+            for i, btn in enumerate(submit_buttons[:10], 1):
+                btn_text = btn.get('text', '')[:50] or btn.get('aria_label', '')[:50]
+                btn_disabled = "DISABLED" if btn.get('disabled') else "ENABLED"
+                submit_section += f"{i}. {btn_disabled} | EXACT TEXT: '{btn_text}'\n"
+        else:
+            submit_section += "  No final submit buttons found (may need intermediate step first)\n"
+        
+        # Build field analysis
+        field_analysis = "📝 INPUT FIELDS:\n"
+        
+        # Show contenteditable if any
+        if contenteditable_fields:
+            field_analysis += "\nCONTENTEDITABLE FIELDS:\n"
+            for i, field in enumerate(contenteditable_fields[:10], 1):
+                field_id = field.get('fieldId', 'unknown')[:50]
+                text = field.get('text', '')[:30]
+                placeholder = field.get('placeholder', '')[:30]
+                aria = field.get('aria_label', '')[:30]
+                pos_y = field.get('position', {}).get('y', 0)
+                status = "HAS CONTENT" if text else "EMPTY"
+                
+                identifier_str = " | ".join(part for part in (
+                    f"placeholder='{placeholder}'" if placeholder else None,
+                    f"aria='{aria}'" if aria else None
+                ) if part) or field_id
+                field_analysis += f"{i}. {status} | Y:{pos_y} | {identifier_str}\n"
+        
+        # Show traditional inputs
+        traditional_inputs = [f for f in input_fields if not f.get('isContentEditable')]
+        if traditional_inputs:
+            field_analysis += "\nINPUT FIELDS:\n"
+            for i, field in enumerate(traditional_inputs[:15], 1):
+                field_id = field.get('fieldId', 'unknown')[:50]
+                field_name = field.get('name', '')
+                field_element_id = field.get('id', '')
+                placeholder = field.get('placeholder', '')[:40]
+                aria = field.get('aria_label', '')[:40]
+                pos_y = field.get('position', {}).get('y', 0)
+                status = "FILLED" if field.get('hasValue') else "EMPTY"
+                
+                combined_text = (placeholder + ' ' + aria + ' ' + field_id).lower()
+                tags = {match.lastgroup for match in FIELD_PURPOSE_RE.finditer(combined_text)}
+                field_purpose = 'name' if 'name' in tags else 'description' if 'description' in tags else 'other'
+                
+                try:
+                    is_already_filled = self.field_tracker.is_filled(field_id, field_purpose, pos_y)
+                    already_filled = "SKIP" if is_already_filled else "CAN FILL"
+                except:
+                    already_filled = "CAN FILL"
+                
+                identifier_str = " | ".join(part for part in (
+                    f"placeholder='{placeholder}'" if placeholder else None,
+                    f"aria='{aria}'" if aria else None,
+                    f"id='{field_element_id}'" if field_element_id else None,
+                    f"name='{field_name}'" if field_name else None
+                ) if part) or field_id
+                field_analysis += f"{i}. {status} | {already_filled} | Y:{pos_y} | {identifier_str}\n"
+        
+        task_context = f"""
+    🎯 TASK CONTEXT ANALYSIS:
+    - Original Task: "{task}"
+    - Target Entity: {task_entity or 'general'}
+    - Current App: {'GITHUB' if is_github else 'LINEAR' if is_linear else 'UNKNOWN'}
+    - Current Section: {current_section}
+    - Has Dialog Open: {has_dialog}
+    - Choice Made: {self.field_tracker.choice_made}
+    - In Creation Flow: {self.field_tracker.in_creation_flow}
+    - Content Already Created: {self.field_tracker.content_created}
     """
         
-        prompt = f"""You are a universal web UI automation agent that learns from the UI.
-
-    TASK: "{task}"
-
-    {task_context}
-
-    CURRENT STATE:
-    - Step: {current_step}
-    - Previous Actions: {json.dumps(previous_actions[-5:]) if previous_actions else "None"}
-    - Consecutive Failures: {consecutive_failures}
-
-    FIELDS ALREADY FILLED:
-    {filled_summary}
-
-    {nav_section}
-
-    {create_section}
-
-    {choice_section}
-
-    {visibility_section}
-
-    {settings_section}
-
-    {intermediate_section}
-
-    {submit_section}
-
-    {field_analysis}
-
-    {github_workflow if is_github else linear_workflow if is_linear else ""}
-
-    UNIVERSAL CRITICAL RULES:
-    1. LEARN from UI - don't assume element locations
-    2. DON'T fill fields marked SKIP
-    3. DO use Y-position to differentiate fields
-    4. DO provide target_y_position in response
-    5. For GitHub: 
-       - Read ALL available buttons from sections above
-       - Fill required fields first (name/title)
-       - Make visibility/template choices if needed
-       - Follow intermediate steps if present
-       - Final submit only when everything is ready
-       - Use EXACT text from submit buttons section
-    6. For Linear: Use existing logic (DON'T CHANGE)
-    7. Be adaptive - if one approach fails, try alternatives from available elements
-    8. ALWAYS check if button is ENABLED before clicking (disabled buttons won't work)
-    9. If submit_buttons visible AND required fields filled → Click submit to complete!
-
-    RESPONSE FORMAT (JSON only):
-    {{
-        "reasoning": "explain what you see, current state, and why you chose this action",
-        "action": "click" | "type" | "type_contenteditable" | "press_key" | "navigate" | "wait" | "complete",
-        "target": "exact text or identifier from UI sections above",
-        "selector_type": "text" | "placeholder" | "aria_label" | "contenteditable" | "id" | "name",
-        "value": "text to type (if typing)",
-        "field_purpose": "title|description|name|summary|body|other",
-        "target_y_position": 0,
-        "wait_after": 2000,
-        "is_complete": false,
-        "confidence": 0.9
-    }}
-
-    CRITICAL FOR TYPING:
-    - Use BEST identifier: id > name > placeholder > aria-label  
-    - Set selector_type to match what you're using
-    - Always include accurate target_y_position from field info above
-
-    PAGE DATA:
-    {json.dumps(dom_data, indent=2)[:12000]}"""
-
-        return prompt
+        # Per-step GitHub state; the workflow guidance itself lives in SYSTEM_PROMPTS
+        workflow_section = ""
+        if is_github:
+            workflow_section = GITHUB_STATE_TMPL.substitute(
+                task_entity_label=task_entity or 'unknown',
+                current_section=current_section,
+                has_dialog=has_dialog,
+                choice_made=self.field_tracker.choice_made,
+                in_creation_flow=self.field_tracker.in_creation_flow,
+                create_count=len(create_buttons),
+                name_field_count=name_field_count,
+                visibility_count=len(visibility_choices),
+                repo_settings_count=len(repo_settings),
+                template_count=len(template_choices),
+                intermediate_count=len(intermediate_buttons),
+                submit_count=len(submit_buttons)
+            )
+        
+        ui_sections = "\n\n    ".join([
+            nav_section,
+            create_section,
+            choice_section,
+            visibility_section,
+            settings_section,
+            intermediate_section,
+            submit_section,
+            field_analysis,
+            workflow_section
+        ])
+        self._sections_cache = (sections_key, (task_context, ui_sections))
+        return task_context, ui_sections, dom_json
     
     async def analyze_and_plan(
         self, 
@@ -864,28 +1492,47 @@ class UniversalUIAgent:
     ) -> Dict[str, Any]:
         """Use GPT-4 to intelligently plan next action"""
         
-        prompt = self.create_smart_prompt(
+        last_action = STEP_PREFIX_RE.sub('', previous_actions[-1]) if previous_actions else ''
+        
+        # First failure on an unchanged page and tracker: retry the plan that just failed once
+        retry_key = self.llm_cache.make_retry_key(
+            task, self._page_fingerprint(dom_data)[1], dom_data.get('url', ''), self.field_tracker
+        )
+        if consecutive_failures == 1:
+            retry_plan = self.llm_cache.get(retry_key)
+            if (retry_plan and not retry_plan.get('is_complete')
+                    and last_action == f"{action_label(retry_plan)} -> ✗"):
+                print("♻️ Page unchanged after a failure, retrying the previous plan")
+                return retry_plan
+        
+        # Structurally identical states after the same last action reuse the decision (skip after failures)
+        cache_key = self.llm_cache.make_key(app_name, task, dom_data, self.field_tracker, last_action)
+        if consecutive_failures == 0:
+            cached_plan = self.llm_cache.get(cache_key, last_action)
+            if cached_plan:
+                print("♻️ Using cached decision")
+                self.llm_cache.put(retry_key, cached_plan)
+                return cached_plan
+        
+        system_prompt, user_prompt = self.create_smart_prompt(
             task, app_name, current_step, dom_data, 
             previous_actions, consecutive_failures
         )
         
+        # Route routine steps (no failures, last action succeeded) to the lighter model
+        is_routine = consecutive_failures == 0 and bool(previous_actions) and previous_actions[-1].endswith('✓')
+        model = ROUTINE_PLANNER_MODEL if is_routine else PLANNER_MODEL
+        
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,
-                max_tokens=1500
-            )
+            response_text = (await asyncio.to_thread(self._stream_plan, system_prompt, user_prompt, model)).strip()
+            action_plan = parse_action_plan(response_text)
             
-            response_text = response.choices[0].message.content.strip()
+            if is_routine and (action_plan is None or action_plan.get('confidence', 0) < ROUTINE_MIN_CONFIDENCE):
+                print(f"🔁 Routine plan unsure, re-asking {PLANNER_MODEL}")
+                response_text = (await asyncio.to_thread(self._stream_plan, system_prompt, user_prompt, PLANNER_MODEL)).strip()
+                action_plan = parse_action_plan(response_text)
             
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
-            
-            if json_start != -1 and json_end > json_start:
-                json_str = response_text[json_start:json_end]
-                action_plan = json.loads(json_str)
-                
+            if action_plan is not None:
                 if 'action' not in action_plan:
                     action_plan['action'] = 'wait'
                 
@@ -894,6 +1541,8 @@ class UniversalUIAgent:
                 action_plan.setdefault('is_complete', False)
                 action_plan.setdefault('target_y_position', 0)
                 
+                self.llm_cache.put(cache_key, action_plan)
+                self.llm_cache.put(retry_key, action_plan)
                 return action_plan
             else:
                 return {
@@ -916,6 +1565,38 @@ class UniversalUIAgent:
                 "target_y_position": 0
             }
     
+    def _stream_plan(self, system_prompt: str, user_prompt: str, model: str = PLANNER_MODEL) -> str:
+        """Stream the planner reply and stop reading once the JSON object closes"""
+        stream = self.client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0,
+            seed=0,
+            max_tokens=PLANNER_MAX_TOKENS,
+            response_format={"type": "json_schema", "json_schema": AGENT_DECISION_SCHEMA},
+            stream=True
+        )
+        
+        tracker = JsonObjectTracker()
+        parts = []
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                parts.append(delta)
+                if tracker.feed(delta):
+                    break
+        finally:
+            stream.response.close()
+        
+        return "".join(parts)
+    
     async def execute_action(self, action_plan: Dict[str, Any]) -> Tuple[bool, str]:
         """Execute planned action"""
         action = action_plan['action']
@@ -926,7 +1607,7 @@ class UniversalUIAgent:
                 return True, "Task marked as complete"
                 
             elif action == 'press_key':
-                key = target or action_plan.get('value', 'Enter')
+                key = target or action_plan.get('value') or 'Enter'
                 print(f"Pressing key: '{key}'")
                 
                 try:
@@ -940,7 +1621,7 @@ class UniversalUIAgent:
                 
             elif action in ['click', 'navigate']:
                 print(f"Clicking: '{target}'")
-                success, msg = await self._smart_click(target, action_plan.get('selector_type', 'text'))
+                success, msg = await self._smart_click(target, sys.intern(action_plan.get('selector_type', 'text')))
                 
                 # Reset tracker when opening new form/page
                 if success and any(word in target.lower() for word in ['create', 'new', 'add', 'repository', 'project', 'issue']):
@@ -950,7 +1631,7 @@ class UniversalUIAgent:
                 
             elif action == 'type_contenteditable':
                 value = action_plan.get('value', '')
-                field_purpose = action_plan.get('field_purpose', 'other')
+                field_purpose = action_plan.get('field_purpose') or 'other'
                 target_y = action_plan.get('target_y_position', 0)
                 
                 field_id = target
@@ -976,9 +1657,9 @@ class UniversalUIAgent:
                 
             elif action == 'type':
                 value = action_plan.get('value', '')
-                field_purpose = action_plan.get('field_purpose', 'other')
+                field_purpose = action_plan.get('field_purpose') or 'other'
                 target_y = action_plan.get('target_y_position', 0)
-                selector_type = action_plan.get('selector_type', 'placeholder')
+                selector_type = sys.intern(action_plan.get('selector_type', 'placeholder'))
                 
                 field_id = target
                 
@@ -1000,7 +1681,7 @@ class UniversalUIAgent:
                 return success, msg
                 
             elif action == 'wait':
-                wait_time = action_plan.get('wait_after', 2000)
+                wait_time = action_plan.get('wait_after') or 2000
                 print(f"Waiting {wait_time}ms...")
                 await self.page.wait_for_timeout(wait_time)
                 return True, f"Waited {wait_time}ms"
@@ -1040,38 +1721,22 @@ class UniversalUIAgent:
                 
                 if count > 0:
                     if target_y > 0:
-                        for idx in range(min(count, 5)):
-                            try:
-                                elem = locator.nth(idx)
-                                if await elem.is_visible(timeout=1000):
-                                    bbox = await elem.bounding_box()
-                                    if bbox:
-                                        elem_y = int(bbox['y'])
-                                        distance = abs(elem_y - target_y)
-                                        
-                                        if distance < 100 and distance < best_distance:
-                                            best_distance = distance
-                                            best_match = elem
-                                            best_strategy_used = i
-                                            
-                                            if distance < 15:
-                                                break
-                            except:
-                                continue
+                        # Nearest visible candidate by Y, in one round-trip
+                        nearest = await locator.evaluate_all(NEAREST_VISIBLE_JS, target_y)
+                        distance = abs(nearest['y'] - target_y) if nearest else best_distance
+                        if distance < 100 and distance < best_distance:
+                            best_distance = distance
+                            best_match = locator.nth(nearest['index'])
+                            best_strategy_used = i
                         
                         if best_match and best_strategy_used < len(strategies) - 1:
                             break
                     else:
                         if i < len(strategies) - 1:
-                            for idx in range(min(count, 2)):
-                                try:
-                                    elem = locator.nth(idx)
-                                    if await elem.is_visible(timeout=1000):
-                                        best_match = elem
-                                        best_strategy_used = i
-                                        break
-                                except:
-                                    continue
+                            visible_index = await locator.evaluate_all(FIRST_VISIBLE_JS)
+                            if visible_index >= 0:
+                                best_match = locator.nth(visible_index)
+                                best_strategy_used = i
                         
                         if best_match:
                             break
@@ -1095,89 +1760,55 @@ class UniversalUIAgent:
     async def _smart_click(self, target: str, selector_type: str = 'text') -> Tuple[bool, str]:
         """Smart clicking with fallback strategies"""
         
-        strategies = []
-        keywords = target.lower().split()
+        target_lower = target.lower()
         
         # Check if this is an intermediate action vs final submit
-        is_intermediate = any(word in target.lower() for word in 
-                            ['continue', 'next', 'proceed', 'choose', 'select', 'skip', 'add'])
-        is_final_submit = any(phrase in target.lower() for phrase in 
-                            ['create repository', 'create project', 'create issue', 'submit', 'publish', 'save'])
-        
-        if selector_type == 'text':
-            # Strategy 1: For final submit, prioritize multi-word exact matches
-            if is_final_submit and ' ' in target:
-                strategies.extend([
-                    f"button:has-text('{target}'):not([disabled])",
-                    f"[role='button']:has-text('{target}'):not([aria-disabled='true'])",
-                    f"text=/^{target}$/i",
-                    f":text-is('{target}')",
-                    f"button:text-is('{target}')",
-                    f"button >> text=/{target}/i",
-                    f"[type='submit']:has-text('{target}')",
-                ])
-            else:
-                # Strategy 1: Exact text match (highest priority)
-                strategies.extend([
-                    f"text=/^{target}$/i",
-                    f":text-is('{target}')",
-                ])
-            
-            # Strategy 2: Specific element types with exact text
-            if is_intermediate:
-                strategies.extend([
-                    f"button:has-text('{target}'):not([disabled])",
-                    f"[role='button']:has-text('{target}'):not([aria-disabled='true'])",
-                ])
-            
-            strategies.extend([
-                f"button:has-text('{target}')",
-                f"a:has-text('{target}')",
-                f"[role='button']:has-text('{target}')",
-                f"[role='link']:has-text('{target}')",
-                f"summary:has-text('{target}')",  # GitHub dropdowns
-            ])
-            
-            # Strategy 3: Partial text match
-            strategies.extend([
-                f"text=/{target}/i",
-                f":text('{target}')"
-            ])
-            
-            # Strategy 4: Keyword-based matching
-            if not is_final_submit or not ' ' in target:
-                for word in keywords:
-                    if len(word) > 3:
-                        strategies.extend([
-                            f"button:has-text('{word}'):not([disabled])",
-                            f"[role='button']:has-text('{word}'):not([aria-disabled='true'])",
-                        ])
-        
-        elif selector_type == 'placeholder':
-            strategies = [
-                f"[placeholder='{target}' i]",
-                f"[placeholder*='{target}' i]"
-            ]
-        elif selector_type == 'aria_label':
-            strategies = [
-                f"[aria-label='{target}' i]",
-                f"[aria-label*='{target}' i]"
-            ]
-        elif selector_type == 'id':
-            strategies = [
-                f"#{target}",
-                f"[id='{target}']"
-            ]
-        elif selector_type == 'name':
-            strategies = [
-                f"[name='{target}']",
-                f"[name*='{target}' i]"
-            ]
-        
-        for i, strategy in enumerate(strategies, 1):
-            try:
-                locator = self.page.locator(strategy).first
-                if await locator.count() > 0:
+        is_intermediate = bool(INTERMEDIATE_RE.search(target))
+        is_final_submit = bool(FINAL_SUBMIT_RE.search(target))
+        
+        builder = CLICK_STRATEGY_BUILDERS.get(selector_type)
+        if builder:
+            strategies = builder(target)
+        elif selector_type == 'text':
+            strategies = build_text_click_strategies(target, is_final_submit, is_intermediate)
+        else:
+            strategies = []
+        
+        # Branches above overlap (e.g. final-submit and intermediate) - keep first occurrence only
+        strategies = list(dict.fromkeys(strategies))
+        
+        # Fetch every remaining strategy's matches concurrently; text/disabled/visible filtering is local
+        match_lists = await asyncio.gather(
+            *(self.page.locator(strategy).evaluate_all(BUTTON_CANDIDATES_JS, []) for strategy in strategies),
+            return_exceptions=True
+        )
+        
+        for i, (strategy, matches) in enumerate(zip(strategies, match_lists), 1):
+            if isinstance(matches, Exception):
+                print(f"  ⚠️ Strategy {i} failed: {str(matches)[:50]}")
+                continue
+            for match in matches:
+                if not match['visible']:
+                    continue
+                
+                # Check if button is disabled
+                if match['disabled']:
+                    print(f"  ⚠️ Strategy {i} found disabled element, skipping...")
+                    continue
+                
+                # Additional check for intermediate vs final
+                button_text = match['text']
+                if is_intermediate and FINAL_BUTTON_RE.search(button_text):
+                    print(f"  ⚠️ Strategy {i} found final submit, but looking for intermediate, skipping...")
+                    continue
+                
+                # Additional check for final submit
+                if is_final_submit and ' ' in target and button_text and target_lower not in button_text.lower():
+                    print(f"  ⚠️ Strategy {i} found '{button_text[:50]}', but looking for '{target}', skipping...")
+                    continue
+                
+                try:
+                    locator = self.page.locator(strategy).nth(match['index'])
                     if is_final_submit and ' ' in target:
                         try:
                             await locator.scroll_into_view_if_needed(timeout=2000)
@@ -1185,36 +1816,13 @@ class UniversalUIAgent:
                         except:
                             pass
                     
-                    if await locator.is_visible(timeout=2000):
-                        # Check if button is disabled
-                        is_disabled = await locator.evaluate("el => el.disabled || el.getAttribute('aria-disabled') === 'true'")
-                        if is_disabled:
-                            print(f"  ⚠️ Strategy {i} found disabled element, skipping...")
-                            continue
-                        
-                        # Additional check for intermediate vs final
-                        if is_intermediate:
-                            button_text = await locator.text_content()
-                            if button_text and any(word in button_text.lower() for word in 
-                                                ['create repository', 'create project', 'create issue', 'submit']):
-                                print(f"  ⚠️ Strategy {i} found final submit, but looking for intermediate, skipping...")
-                                continue
-                        
-                        # Additional check for final submit
-                        if is_final_submit and ' ' in target:
-                            button_text = await locator.text_content()
-                            if button_text:
-                                if target.lower() not in button_text.lower():
-                                    print(f"  ⚠️ Strategy {i} found '{button_text[:50]}', but looking for '{target}', skipping...")
-                                    continue
-                        
-                        await locator.click(timeout=5000)
-                        await self.page.wait_for_timeout(2000)
-                        print(f"  ✅ Clicked using strategy {i}: '{strategy[:60]}'")
-                        return True, f"Clicked using strategy {i}"
-            except Exception as e:
-                print(f"  ⚠️ Strategy {i} failed: {str(e)[:50]}")
-                continue
+                    await locator.click(timeout=5000)
+                    await self.page.wait_for_timeout(2000)
+                    print(f"  ✅ Clicked using strategy {i}: '{strategy[:60]}'")
+                    return True, f"Clicked using strategy {i}"
+                except Exception as e:
+                    print(f"  ⚠️ Strategy {i} failed: {str(e)[:50]}")
+                    break
         
         # Last resort for final submit
         if is_final_submit and ' ' in target:
@@ -1222,20 +1830,23 @@ class UniversalUIAgent:
             if len(words) == 2:
                 print(f"  🔍 Last resort: Looking for button containing both '{words[0]}' and '{words[1]}'")
                 try:
-                    all_buttons = await self.page.locator("button, [role='button']").all()
-                    for btn in all_buttons:
+                    # Filter every button in one browser round-trip instead of 3 calls per button
+                    all_buttons = self.page.locator("button, [role='button']")
+                    candidates = await all_buttons.evaluate_all(
+                        BUTTON_CANDIDATES_JS, [word.lower() for word in words]
+                    )
+                    for candidate in candidates:
+                        print(f"  Found candidate: '{candidate['text'][:50]}'")
+                        if candidate['disabled'] or not candidate['visible']:
+                            continue
                         try:
-                            btn_text = await btn.text_content()
-                            if btn_text and all(word.lower() in btn_text.lower() for word in words):
-                                print(f"  Found candidate: '{btn_text[:50]}'")
-                                is_disabled = await btn.evaluate("el => el.disabled || el.getAttribute('aria-disabled') === 'true'")
-                                if not is_disabled and await btn.is_visible():
-                                    await btn.scroll_into_view_if_needed()
-                                    await self.page.wait_for_timeout(500)
-                                    await btn.click(timeout=5000)
-                                    await self.page.wait_for_timeout(2000)
-                                    print(f"  ✅ Clicked using last resort method")
-                                    return True, "Clicked using last resort method"
+                            btn = all_buttons.nth(candidate['index'])
+                            await btn.scroll_into_view_if_needed()
+                            await self.page.wait_for_timeout(500)
+                            await btn.click(timeout=5000)
+                            await self.page.wait_for_timeout(2000)
+                            print(f"  ✅ Clicked using last resort method")
+                            return True, "Clicked using last resort method"
                         except:
                             continue
                 except Exception as e:
@@ -1246,45 +1857,8 @@ class UniversalUIAgent:
     async def _smart_type(self, target: str, value: str, selector_type: str = 'placeholder', target_y: int = 0) -> Tuple[bool, str]:
         """Smart typing with position awareness"""
         
-        strategies = []
-        
-        if target and not ' ' in target and len(target) > 5:
-            strategies.append(f"#{target}")
-            strategies.append(f"input#{target}")
-            strategies.append(f"[id='{target}']")
-        
-        if target:
-            strategies.append(f"[name='{target}']")
-            strategies.append(f"[name*='{target}' i]")
-        
-        if selector_type == 'placeholder' or target:
-            strategies.extend([
-                f"[placeholder='{target}' i]",
-                f"[placeholder*='{target}' i]",
-                f"[aria-placeholder*='{target}' i]"
-            ])
-        
-        if selector_type == 'aria_label' or target:
-            strategies.extend([
-                f"[aria-label='{target}' i]",
-                f"[aria-label*='{target}' i]"
-            ])
-        
-        if target:
-            strategies.append(f"[data-testid*='{target}' i]")
-        
-        if target and len(target.split()) <= 3:
-            strategies.append(f"label:has-text('{target}') >> input")
-            strategies.append(f":text('{target}') >> .. >> input")
-        
-        if target_y > 0:
-            strategies.extend([
-                "input[type='text']:visible",
-                "input:not([type='hidden']):not([type='submit']):visible",
-                "textarea:visible"
-            ])
-        
-        strategies.append("[contenteditable='true']")
+        strategies = build_type_strategies(target, selector_type, target_y > 0)
+        locators = [self._type_locator(strategy) for strategy in strategies]
         
         best_match = None
         best_distance = float('inf')
@@ -1292,53 +1866,51 @@ class UniversalUIAgent:
         
         print(f"  🔍 Trying {len(strategies)} strategies to find field...")
         
-        for i, selector in enumerate(strategies, 1):
+        # Count the leading strategies concurrently; the tail is only counted if reached
+        head_counts = await asyncio.gather(
+            *(locator.count() for locator in locators[:TYPE_COUNT_BATCH_SIZE]),
+            return_exceptions=True
+        )
+        
+        for i, (selector, locator) in enumerate(zip(strategies, locators), 1):
             try:
-                locator = self.page.locator(selector)
-                count = await locator.count()
+                if i <= len(head_counts):
+                    count = head_counts[i - 1]
+                    if isinstance(count, Exception):
+                        continue
+                else:
+                    count = await locator.count()
                 
                 if count > 0:
-                    print(f"    Strategy {i}: Found {count} elements with '{selector[:50]}'")
+                    print(f"    Strategy {i}: Found {count} elements with '{str(selector)[:50]}'")
                     
                     if target_y > 0:
-                        for idx in range(min(count, 5)):
-                            try:
-                                elem = locator.nth(idx)
-                                if await elem.is_visible(timeout=1000):
-                                    bbox = await elem.bounding_box()
-                                    if bbox:
-                                        elem_y = int(bbox['y'])
-                                        distance = abs(elem_y - target_y)
-                                        
-                                        max_distance = 150 if i > 6 else 80
-                                        
-                                        if distance < max_distance and distance < best_distance:
-                                            best_distance = distance
-                                            best_match = elem
-                                            best_strategy_used = i
-                                            print(f"      → Candidate at Y:{elem_y}, distance:{distance}px")
-                                            
-                                            if distance < 20:
-                                                print(f"      ✓ Perfect match!")
-                                                break
-                            except:
-                                continue
+                        # Nearest visible match by Y, in one round-trip
+                        nearest = await locator.evaluate_all(NEAREST_VISIBLE_JS, target_y)
+                        if nearest:
+                            distance = abs(nearest['y'] - target_y)
+                            max_distance = 150 if i > PRIORITY_TYPE_STRATEGIES else 80
+                            
+                            if distance < max_distance and distance < best_distance:
+                                best_distance = distance
+                                best_match = locator.nth(nearest['index'])
+                                best_strategy_used = i
+                                print(f"      → Candidate at Y:{nearest['y']}, distance:{distance}px")
+                                
+                                if distance < 20:
+                                    print(f"      ✓ Perfect match!")
                         
-                        if best_match and best_strategy_used <= 6 and best_distance < 50:
+                        # A perfect match ends the search whichever strategy found it
+                        if best_match and (best_distance < 20 or (best_strategy_used <= PRIORITY_TYPE_STRATEGIES and best_distance < 50)):
                             break
                     else:
-                        for idx in range(min(count, 2)):
-                            try:
-                                elem = locator.nth(idx)
-                                if await elem.is_visible(timeout=1000):
-                                    best_match = elem
-                                    best_strategy_used = i
-                                    print(f"      → Using first visible element")
-                                    break
-                            except:
-                                continue
+                        visible_index = await locator.evaluate_all(FIRST_VISIBLE_JS)
+                        if visible_index >= 0:
+                            best_match = locator.nth(visible_index)
+                            best_strategy_used = i
+                            print(f"      → Using first visible element")
                         
-                        if best_match and i <= 6:
+                        if best_match:
                             break
             except:
                 continue
@@ -1351,39 +1923,55 @@ class UniversalUIAgent:
                     await best_match.click(timeout=2000, force=True)
                 except:
                     await best_match.scroll_into_view_if_needed()
-                    await self.page.wait_for_timeout(300)
                     await best_match.click(timeout=2000)
                 
-                await self.page.wait_for_timeout(500)
-                
                 success = False
                 
+                # One insertText call into the focused, cleared field; the chain below is the fallback
                 try:
-                    await best_match.fill('', timeout=1000)
-                    await self.page.wait_for_timeout(200)
-                    await best_match.fill(value, timeout=2000)
-                    await self.page.wait_for_timeout(500)
-                    print(f"  ✅ Typed using fill() method")
-                    success = True
+                    await best_match.focus()
+                    if await best_match.evaluate(CLEAR_VALUE_JS):
+                        await self.page.keyboard.insert_text(value)
+                        if await best_match.input_value(timeout=1000) == value:
+                            print(f"  ✅ Typed using insert_text()")
+                            success = True
                 except Exception as e:
-                    print(f"    ⚠️ fill() failed: {str(e)[:50]}")
+                    print(f"    ⚠️ insert_text() failed: {str(e)[:50]}")
                 
                 if not success:
                     try:
-                        await best_match.click(force=True)
-                        await self.page.keyboard.press('Control+A')
-                        await self.page.wait_for_timeout(100)
-                        await self.page.keyboard.type(value, delay=50)
-                        await self.page.wait_for_timeout(500)
-                        print(f"  ✅ Typed using keyboard method")
+                        await best_match.fill('', timeout=1000)
+                        await best_match.fill(value, timeout=2000)
+                        await self._wait_for_value(best_match, value)
+                        print(f"  ✅ Typed using fill() method")
                         success = True
+                    except Exception as e:
+                        print(f"    ⚠️ fill() failed: {str(e)[:50]}")
+                
+                if not success:
+                    try:
+                        # Type at full speed first; slow down only if keystrokes were dropped
+                        for delay in KEYBOARD_TYPE_DELAYS:
+                            await best_match.click(force=True)
+                            await self.page.keyboard.press('Control+A')
+                            await self.page.keyboard.type(value, delay=delay)
+                            if await self._field_has_value(best_match, value):
+                                print(f"  ✅ Typed using keyboard method")
+                                success = True
+                                break
+                            print(f"    ⚠️ Value mismatch after typing with delay={delay}ms")
                     except Exception as e:
                         print(f"    ⚠️ keyboard typing failed: {str(e)[:50]}")
                 
                 if not success:
                     try:
+                        # Select any partial text left by the keyboard attempts so it gets replaced
+                        try:
+                            await best_match.select_text(timeout=1000)
+                        except Exception:
+                            pass
                         await best_match.press_sequentially(value, delay=50)
-                        await self.page.wait_for_timeout(500)
+                        await self._wait_for_value(best_match, value)
                         print(f"  ✅ Typed using press_sequentially()")
                         success = True
                     except Exception as e:
@@ -1401,6 +1989,51 @@ class UniversalUIAgent:
         print(f"  ❌ No suitable input field found")
         return False, f"Could not find field: {target}"
     
+    def _type_locator(self, strategy: Union[str, Tuple[str, str]]):
+        """Resolve a _smart_type strategy to a Locator (selector string or accessibility query)"""
+        if isinstance(strategy, str):
+            return self.page.locator(strategy)
+        kind, name = strategy
+        if kind == 'label':
+            return self.page.get_by_label(name)
+        return self.page.get_by_role(kind, name=name)
+    
+    async def _field_has_value(self, locator, value: str) -> bool:
+        """Check a field's current value (elements without one, e.g. contenteditable, pass)"""
+        try:
+            return await locator.input_value(timeout=1000) == value
+        except Exception:
+            return True
+    
+    async def _wait_for_value(self, locator, value: str, timeout: int = 2000) -> bool:
+        """Wait until a field reports the typed value, instead of sleeping a fixed time"""
+        try:
+            await expect(locator).to_have_value(value, timeout=timeout)
+            return True
+        except Exception:
+            return False
+    
+    async def _wait_for_settle(self, wait_time: int):
+        """Wait for the DOM changes an action triggers to stop, with wait_time as the upper bound"""
+        if wait_time <= 0:
+            return
+        try:
+            await self.page.evaluate(DOM_SETTLE_JS, [min(DOM_SETTLE_QUIET_MS, wait_time), wait_time])
+        except Exception:
+            # The action navigated away mid-wait; wait for the new document instead
+            try:
+                await self.page.wait_for_load_state('domcontentloaded', timeout=wait_time)
+            except Exception:
+                pass
+    
+    def _mark_completed(self, workflow: TaskWorkflow, step: int):
+        """Mark the workflow completed at this step and print the completion banner"""
+        workflow.completion_status = "completed"
+        workflow.total_steps = step
+        print(f"\n{'='*60}")
+        print(f"✅ TASK COMPLETED IN {step} STEPS!")
+        print(f"{'='*60}")
+    
     async def execute_task(
         self, 
         task: str, 
@@ -1418,11 +2051,10 @@ class UniversalUIAgent:
         try:
             print(f"🌐 Navigating to {app_url}...")
             await self.page.goto(app_url, wait_until='domcontentloaded', timeout=60000)
-            await self.page.wait_for_timeout(3000)
         except:
             print(f"⚠️ Using current page: {self.page.url}")
         
-        if any(kw in self.page.url.lower() for kw in ['login', 'signin', 'auth', 'sessions/verified']):
+        if LOGIN_RE.search(self.page.url):
             if not await self.wait_for_login(app_name):
                 raise Exception("Login failed or timeout")
         
@@ -1435,21 +2067,32 @@ class UniversalUIAgent:
             completion_status="in_progress"
         )
         
-        actions_taken = []
+        actions_taken = workflow.actions_taken
         consecutive_failures = 0
         same_action_count = 0
         last_action_signature = ""
         initial_url = self.page.url
         creation_completed = False  # NEW: Track if creation action completed
+        creation_url_matches = creation_url_predicate(app_name, task.lower(), initial_url)
         
         for step in range(1, max_steps + 1):
             print(f"\n{'─'*60}")
             print(f"📍 STEP {step}/{max_steps}")
             print(f"{'─'*60}")
             
-            screenshot_path = await self.capture_screenshot(step, f"step_{step}")
-            print(f"📸 Screenshot: {screenshot_path}")
+            # NEW: Check if creation was completed by detecting URL change after final submit
+            current_url = self.page.url
+            if creation_completed and creation_url_matches is not None:
+                if creation_url_matches(current_url):
+                    print(f"✅ URL changed to created entity: {current_url}")
+                    print(f"✅ Creation detected - Task completed!")
+                    self._mark_completed(workflow, step)
+                    break
+                else:
+                    print(f"⚠️ URL unchanged or unexpected: {current_url}")
             
+            # Screenshot runs in the background through DOM extraction and planning
+            screenshot_task = asyncio.create_task(self.capture_screenshot(step, f"step_{step}"))
             dom_data = await self.get_comprehensive_dom_context()
             print(f"DOM: {len(dom_data['elements'])} elements")
             print(f"Section: {dom_data.get('currentSection', 'unknown')}")
@@ -1458,48 +2101,20 @@ class UniversalUIAgent:
             elif dom_data.get('isLinear'):
                 print(f"Linear Mode")
             
-            # NEW: Check if creation was completed by detecting URL change after final submit
-            current_url = self.page.url
-            if creation_completed:
-                # Wait a bit for page to load after creation
-                await self.page.wait_for_timeout(2000)
-                
-                # Check if URL changed to show the created entity
-                task_lower = task.lower()
-                url_indicates_success = False
-                
-                if 'project' in task_lower:
-                    # For projects, URL should change from /projects/new to /users/{user}/projects/{number}
-                    url_indicates_success = '/projects/' in current_url and '/new' not in current_url and current_url != initial_url
-                elif 'repository' in task_lower or 'repo' in task_lower:
-                    # For repos, URL should be /{user}/{repo-name}
-                    url_indicates_success = current_url.count('/') >= 4 and '/new' not in current_url
-                elif 'issue' in task_lower:
-                    # For issues, URL should be /{user}/{repo}/issues/{number}
-                    url_indicates_success = '/issues/' in current_url and current_url.count('/') >= 5
-                
-                if url_indicates_success:
-                    print(f"✅ URL changed to created entity: {current_url}")
-                    print(f"✅ Creation detected - Task completed!")
-                    workflow.completion_status = "completed"
-                    workflow.total_steps = step
-                    print(f"\n{'='*60}")
-                    print(f"✅ TASK COMPLETED IN {step} STEPS!")
-                    print(f"{'='*60}")
-                    break
-                else:
-                    print(f"⚠️ URL unchanged or unexpected: {current_url}")
-            
             action_plan = await self.analyze_and_plan(
                 task=task,
                 app_name=app_name,
                 current_step=step,
                 dom_data=dom_data,
-                previous_actions=actions_taken,
+                previous_actions=actions_taken[-PLANNER_ACTION_HISTORY:],
                 consecutive_failures=consecutive_failures
             )
             
-            print(f"Reasoning: {action_plan.get('reasoning', 'N/A')[:250]}")
+            # The action below changes the page, so the screenshot must be done first
+            screenshot_path = await screenshot_task
+            print(f"📸 Screenshot: {screenshot_path}")
+            
+            print(f"Reasoning: {(action_plan.get('reasoning') or 'N/A')[:250]}")
             print(f"Action: {action_plan['action']}")
             if action_plan.get('target'):
                 print(f"🎯 Target: {action_plan['target'][:100]}")
@@ -1521,30 +2136,24 @@ class UniversalUIAgent:
             
             ui_state = UIState(
                 step_number=step,
-                description=action_plan.get('reasoning', 'Unknown'),
+                description=action_plan.get('reasoning') or 'Unknown',
                 screenshot_path=screenshot_path,
                 url=self.page.url,
                 timestamp=datetime.now().isoformat(),
-                actions_taken=actions_taken.copy()
+                actions_taken_upto=len(actions_taken)
             )
             workflow.states.append(ui_state)
             
             success, message = await self.execute_action(action_plan)
             
             # NEW: Detect if this was a final submit action
-            target = action_plan.get('target', '').lower()
-            is_final_submit = any(phrase in target for phrase in 
-                                ['create repository', 'create project', 'create issue', 
-                                'submit new issue', 'create pull request', 'publish'])
+            is_final_submit = bool(CREATION_SUBMIT_RE.search(action_plan.get('target', '')))
             
             if success and is_final_submit:
                 print(f"  🎉 Final submit action completed!")
                 creation_completed = True
             
-            action_summary = f"Step {step}: {action_plan['action']}"
-            if action_plan.get('target'):
-                action_summary += f" - {action_plan['target'][:50]}"
-            action_summary += f" -> {'✓' if success else '✗'}"
+            action_summary = f"Step {step}: {action_label(action_plan)} -> {'✓' if success else '✗'}"
             actions_taken.append(action_summary)
             
             if success:
@@ -1554,15 +2163,23 @@ class UniversalUIAgent:
                 print(f"❌ {message}")
                 consecutive_failures += 1
             
-            wait_time = action_plan.get('wait_after', 1500)
-            await self.page.wait_for_timeout(wait_time)
+            # Wake as soon as the final submit navigates to the created entity
+            if success and is_final_submit and creation_url_matches is not None:
+                try:
+                    await self.page.wait_for_url(creation_url_matches, timeout=10000)
+                    print(f"✅ URL changed to created entity: {self.page.url}")
+                    self._mark_completed(workflow, step)
+                    break
+                except PlaywrightTimeoutError:
+                    print(f"⚠️ URL unchanged or unexpected: {self.page.url}")
+                except Exception as e:
+                    print(f"⚠️ Could not confirm creation URL: {str(e)[:100]}")
+            
+            # wait_after is an upper bound: move on once the page stops changing
+            await self._wait_for_settle(action_plan.get('wait_after', 1500))
             
             if action_plan.get('is_complete') and action_plan.get('confidence', 0) > 0.7:
-                workflow.completion_status = "completed"
-                workflow.total_steps = step
-                print(f"\n{'='*60}")
-                print(f"✅ TASK COMPLETED IN {step} STEPS!")
-                print(f"{'='*60}")
+                self._mark_completed(workflow, step)
                 break
             
             if consecutive_failures >= 4:
@@ -1575,12 +2192,55 @@ class UniversalUIAgent:
             workflow.completion_status = "max_steps_reached"
             workflow.total_steps = max_steps
         
+        print(f"LLM cache: {self.llm_cache.stats()}")
         return workflow
     
-    def save_workflow(self, workflow: TaskWorkflow, output_path: str):
+    async def run_tasks(
+        self, tasks: List[Tuple[str, str, str]], max_steps: int = 20
+    ) -> List[Union[TaskWorkflow, BaseException]]:
+        """Run independent (task, app_url, app_name) jobs concurrently, one page each.
+        
+        Results are in task order; a job that raised (e.g. login timeout) yields its exception
+        in place of a TaskWorkflow, and the other jobs run to completion before the pages close."""
+        pages = [await self.browser.new_page() for _ in tasks]
+        try:
+            return await asyncio.gather(*[
+                self._run_one(page, worker_id, task, app_url, app_name, max_steps)
+                for worker_id, (page, (task, app_url, app_name)) in enumerate(zip(pages, tasks), 1)
+            ], return_exceptions=True)
+        finally:
+            for page in pages:
+                await page.close()
+    
+    async def _run_one(
+        self,
+        page: Page,
+        worker_id: int,
+        task: str,
+        app_url: str,
+        app_name: str,
+        max_steps: int
+    ) -> TaskWorkflow:
+        """Execute one task on its own page with its own field tracker"""
+        # Shallow copy shares the OpenAI client, browser context and LLM cache
+        worker = copy.copy(self)
+        worker.page = page
+        worker.field_tracker = FormFieldTracker()
+        worker.screenshots_dir = self.screenshots_dir / f"task_{worker_id}"
+        worker.screenshots_dir.mkdir(exist_ok=True)
+        worker._screens_str = str(worker.screenshots_dir)
+        return await worker.execute_task(task, app_url, app_name, max_steps)
+    
+    async def save_workflow(self, workflow: TaskWorkflow, output_path: str):
         """Save workflow to JSON"""
-        with open(output_path, 'w') as f:
-            json.dump(asdict(workflow), f, indent=2)
+        data = asdict(workflow)
+        # Expand each state's history from the shared list, keeping the per-state JSON layout
+        actions_taken = data.pop('actions_taken')
+        for state in data['states']:
+            state['actions_taken'] = actions_taken[:state.pop('actions_taken_upto')]
+        
+        payload = _dumps(data, indent=True)
+        await asyncio.to_thread(Path(output_path).write_text, payload, encoding='utf-8')
         print(f"💾 Workflow saved: {output_path}")
 
 
@@ -1620,7 +2280,7 @@ async def main():
         
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"workflow_{app_name}_{timestamp}.json"
-        agent.save_workflow(workflow, filename)
+        await agent.save_workflow(workflow, filename)
         
         print(f"\n{'='*60}")
         print("EXECUTION SUMMARY")
@@ -1645,5 +2305,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
\ No newline at end of file